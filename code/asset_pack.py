@@ -0,0 +1,72 @@
+import json
+import mmap
+import os
+import struct
+
+import pygame
+
+# Layout: MAGIC, u32 index length, JSON index, padding to ALIGN, raw pixel data.
+# Index offsets are relative to the start of the pixel data. Every entry points
+# at pixels already at their final size and in the display's byte order, so
+# loading is a frombuffer over the mapped file.
+MAGIC = b'SSPACK1\0'
+HEADER = struct.Struct('<8sI')
+ALIGN = 16
+PACK_PATH = './graphics/assets.pack'
+
+
+def data_start(index_length):
+    header_length = HEADER.size + index_length
+    return header_length + (-header_length % ALIGN)
+
+
+def pack_key(path):
+    return os.path.normpath(path).replace(os.sep, '/')
+
+
+class AssetPack:
+    def __init__(self, path=PACK_PATH):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, index_length = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f'{path} is not an asset pack')
+        self.index = json.loads(self.data[HEADER.size:HEADER.size + index_length])
+        self.base = data_start(index_length)
+        self.view = memoryview(self.data)
+
+    def __contains__(self, path):
+        return pack_key(path) in self.index
+
+    def surface(self, path):
+        entry = self.index[pack_key(path)]
+        return self.entry_surface(entry['frames'][0] if 'frames' in entry else entry)
+
+    def frames(self, path):
+        entry = self.index[pack_key(path)]
+        return [self.entry_surface(frame) for frame in entry.get('frames', [entry])]
+
+    def entry_surface(self, entry):
+        width, height = entry['size']
+        offset = self.base + entry['offset']
+        bytes_per_pixel = 1 if entry['format'] == 'P' else 4
+        pixels = self.view[offset:offset + width * height * bytes_per_pixel]
+        # Zero-copy: the surface reads straight from the mapped file
+        surface = pygame.image.frombuffer(pixels, (width, height), entry['format'])
+        if entry['format'] == 'P':
+            start = self.base + entry['palette']
+            palette = self.data[start:start + 768]
+            surface.set_palette([tuple(palette[i:i + 3]) for i in range(0, 768, 3)])
+        return surface
+
+    @classmethod
+    def open_default(cls):
+        return cls() if os.path.exists(PACK_PATH) else None
+
+    def close(self):
+        # Surfaces handed out keep the mapping alive until they are collected
+        self.view = None
+        self.data = None
+        self.file.close()
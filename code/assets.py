@@ -0,0 +1,119 @@
+import weakref
+
+import pygame
+
+
+class SilentSound:
+    # Handed out when the mixer is not running (headless runs, no audio device)
+    def play(self, *args, **kwargs):
+        return None
+
+    def stop(self):
+        pass
+
+    def set_volume(self, volume):
+        pass
+
+
+
+class AssetRegistry:
+    # Every surface, sound and font is decoded once and then handed out by
+    # key, so wave spawns and restarts never go back to the disk.
+    def __init__(self):
+        self.images = {}
+        self.sounds = {}
+        self.fonts = {}
+        self.texts = {}
+        # Animations are not shared, every caller plays its own; these are the live ones
+        self.animations = weakref.WeakSet()
+        self.hits = 0
+        self.misses = 0
+        self.pack = None
+
+    def attach_pack(self, pack):
+        # Images found in the pack are mapped from disk instead of decoded
+        self.pack = pack
+        self.invalidate()
+
+    def _lookup(self, cache, key, load):
+        asset = cache.get(key)
+        if asset is not None:
+            self.hits += 1
+            return asset
+        self.misses += 1
+        asset = load()
+        cache[key] = asset
+        return asset
+
+    def image(self, path, alpha=True):
+        def load():
+            headless = pygame.display.get_surface() is None
+            if self.pack is not None and path in self.pack:
+                surface = self.pack.surface(path)
+                # Pack pixels already match the display format; opaque images
+                # get one copy so their per-frame blits skip alpha blending
+                return surface if alpha or headless else surface.convert()
+            surface = pygame.image.load(path)
+            if headless:
+                return surface  # Nothing to convert to without a window
+            return surface.convert_alpha() if alpha else surface.convert()
+        return self._lookup(self.images, (path, alpha), load)
+
+    def scaled(self, path, size, alpha=True):
+        # One resized copy per target size, made the first time it is asked for
+        def load():
+            image = self.image(path, alpha)
+            return image if image.get_size() == size else pygame.transform.scale(image, size)
+        return self._lookup(self.images, (path, alpha, size), load)
+
+    def sound(self, path, volume=None):
+        # Volume lives on the Sound object, so each volume gets its own copy
+        def load():
+            if not pygame.mixer.get_init():
+                return SilentSound()
+            sound = pygame.mixer.Sound(path)
+            if volume is not None:
+                sound.set_volume(volume)
+            return sound
+        return self._lookup(self.sounds, (path, volume), load)
+
+    def font(self, path, size):
+        return self._lookup(self.fonts, (path, size), lambda: pygame.font.Font(path, size))
+
+    def text(self, path, size):
+        # Rendered strings outlive restarts along with the font they came from
+        from text_cache import TextCache
+        return self._lookup(self.texts, (path, size), lambda: TextCache(self.font(path, size)))
+
+    def animation(self, path, max_bytes=None):
+        # A new animation per caller, since releasing one must not take the
+        # frames away from another game. It loads its frames the first time
+        # one is shown and can release them again, so nothing is decoded here
+        from home_screen import FRAME_BUDGET, HomeScreenAnimation
+        animation = HomeScreenAnimation(path, self.pack, FRAME_BUDGET if max_bytes is None else max_bytes)
+        self.animations.add(animation)
+        return animation
+
+    def invalidate(self, path=None):
+        # Drop one file (every variant of it) or, with no path, everything
+        for cache in (self.images, self.sounds, self.fonts, self.texts):
+            if path is None:
+                cache.clear()
+            else:
+                for key in [key for key in cache if key[0] == path]:
+                    del cache[key]
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'images': len(self.images),
+            'sounds': len(self.sounds),
+            'fonts': len(self.fonts),
+            'texts': sum(len(text) for text in self.texts.values()),
+            'animations': len(self.animations),
+            'animation_bytes': sum(animation.resident_bytes() for animation in self.animations),
+        }
+
+
+assets = AssetRegistry()
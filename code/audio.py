@@ -0,0 +1,84 @@
+import os
+
+import pygame
+
+from assets import assets
+
+# name: (file, volume, category). Effects sharing a file share one Sound;
+# the volume is applied on the channel at play time.
+EFFECTS = {
+    'player_laser': ('./audio/laser.wav', 0.2, 'player'),
+    'alien_laser': ('./audio/laser.wav', 0.5, 'aliens'),
+    'explosion': ('./audio/explosion.wav', 0.3, 'explosions'),
+}
+
+# Channels reserved per category. A burst in one category reuses its own
+# channels instead of taking the others', and music never uses a channel.
+BUDGETS = {'player': 2, 'aliens': 4, 'explosions': 4}
+SPARE_CHANNELS = 2
+
+
+class AudioManager:
+    def __init__(self, effects=EFFECTS, budgets=BUDGETS):
+        self.effects = effects
+        self.budgets = budgets
+        self.sounds = None
+        self.channels = {}
+        self.cursors = {}
+        self.music_path = None
+
+    def ready(self):
+        # Sets up the channel pools the first time the mixer is found running
+        if self.sounds is not None:
+            return True
+        if not pygame.mixer.get_init():
+            return False
+        reserved = sum(self.budgets.values())
+        pygame.mixer.set_num_channels(reserved + SPARE_CHANNELS)
+        pygame.mixer.set_reserved(reserved)
+        first = 0
+        for category, budget in self.budgets.items():
+            self.channels[category] = [pygame.mixer.Channel(index) for index in range(first, first + budget)]
+            self.cursors[category] = 0
+            first += budget
+        self.sounds = {name: assets.sound(path) for name, (path, _, _) in self.effects.items()}
+        return True
+
+    def preload(self):
+        self.ready()
+
+    def channel(self, category):
+        channels = self.channels[category]
+        for channel in channels:
+            if not channel.get_busy():
+                return channel
+        # Every channel is busy: cut one off, taking them in turn
+        cursor = self.cursors[category]
+        self.cursors[category] = (cursor + 1) % len(channels)
+        return channels[cursor]
+
+    def play(self, name):
+        if not self.ready():
+            return
+        _, volume, category = self.effects[name]
+        channel = self.channel(category)
+        channel.set_volume(volume)
+        channel.play(self.sounds[name])
+
+    def play_music(self, path, volume=0.2):
+        # Streamed from disk by pygame.mixer.music; asking for the track that
+        # is already playing does nothing, so it can never stack
+        if not self.ready() or path == self.music_path or not os.path.exists(path):
+            return
+        pygame.mixer.music.load(path)
+        pygame.mixer.music.set_volume(volume)
+        pygame.mixer.music.play(loops=-1)
+        self.music_path = path
+
+    def stop_music(self):
+        if self.music_path is not None:
+            pygame.mixer.music.stop()
+            self.music_path = None
+
+
+audio = AudioManager()
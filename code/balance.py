@@ -0,0 +1,209 @@
+# Plays many headless games per parameter set across a process pool and
+# summarizes how they went. Run from the project root:
+#   python code/balance.py --sessions 500 --set laser_cooldown=500,700,900
+#   python code/balance.py --policy tracker --set alien_laser_interval=500,700 --set extra_speed=4,6
+#   python code/balance.py --set value_r=100,200 --output balance.json
+import argparse
+import copy
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from random import Random
+
+import numpy as np
+import pygame
+
+from controls import PlayerInput
+from states import PLAYING, WON
+from timestep import STEP_MS
+from waves import WAVES_PATH, WaveSet
+
+# Knobs a parameter set can turn. value_<symbol> sets the score of one alien
+# type from the wave file, e.g. value_r for the red aliens.
+PARAMETERS = ['laser_cooldown', 'alien_laser_interval', 'extra_speed', 'extra_value']
+DEFAULT_MAX_STEPS = round(5 * 60 * 1000 / STEP_MS)  # Five minutes of play
+
+
+class RandomPolicy:
+    # Holds a random move and trigger for a few steps at a time, like a distracted player
+    def __init__(self, game, seed, hold=10):
+        self.random = Random(seed)
+        self.hold = hold
+        self.steps = 0
+        self.current = PlayerInput(0, False)
+
+    def poll(self):
+        if self.steps % self.hold == 0:
+            self.current = PlayerInput(self.random.choice([-1, 0, 1]), self.random.random() < 0.5)
+        self.steps += 1
+        return self.current
+
+
+class SweepPolicy:
+    # Walks the screen edge to edge, firing whenever it can
+    def __init__(self, game, seed, period=180):
+        self.period = period
+        self.steps = seed % period
+
+    def poll(self):
+        self.steps += 1
+        return PlayerInput(1 if self.steps % self.period < self.period // 2 else -1, True)
+
+
+class TrackerPolicy:
+    # Chases the lowest alien's column and fires, a rough stand-in for a decent player
+    def __init__(self, game, seed):
+        self.game = game
+
+    def poll(self):
+        aliens = self.game.aliens
+        if not aliens:
+            return PlayerInput(0, True)
+        alive = aliens.alive_indices()
+        lowest = alive[int(np.argmax(aliens.y[alive]))]
+        target = aliens.center(lowest)[0]
+        x = self.game.player.sprite.rect.centerx
+        return PlayerInput(0 if abs(target - x) < 5 else 1 if target > x else -1, True)
+
+
+POLICIES = {'random': RandomPolicy, 'sweep': SweepPolicy, 'tracker': TrackerPolicy}
+
+# One game per worker process, restarted for every session
+_game = None
+_wave_data = None
+_wave_sets = {}
+
+
+def init_worker():
+    global _game, _wave_data
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    from headless import create_headless_game
+    _game = create_headless_game()
+    with open(WAVES_PATH) as f:
+        _wave_data = json.load(f)
+
+
+def wave_set(params):
+    # The wave file with the parameter set's fire interval and alien values
+    key = tuple(sorted((name, value) for name, value in params.items()
+                       if name == 'alien_laser_interval' or name.startswith('value_')))
+    if key not in _wave_sets:
+        data = copy.deepcopy(_wave_data)
+        for name, value in key:
+            if name == 'alien_laser_interval':
+                for wave in data['waves']:
+                    wave['fire_interval'] = value
+                data.setdefault('endless', {})['fire_interval'] = value
+            else:
+                data['aliens'][name[len('value_'):]]['value'] = value
+        _wave_sets[key] = WaveSet(data)
+    return _wave_sets[key]
+
+
+def play_session(task):
+    params, policy, seed, max_steps, endless = task
+    game = _game
+    waves = wave_set(params)
+    if game.wave_set is not waves:
+        game.wave_set = waves
+        game.alien_templates.clear()  # Templates carry the alien values
+    game.endless = endless
+    game.extra_speed = params.get('extra_speed', 4)
+    game.extra_value = params.get('extra_value', 500)
+    game.input_source = POLICIES[policy](game, seed)
+    game.reset_game(seed)
+    if 'laser_cooldown' in params:
+        game.player.sprite.laser_cooldown = params['laser_cooldown']
+
+    steps = 0
+    while game.state == PLAYING and steps < max_steps:
+        game.step()
+        steps += 1
+    return {'score': game.score, 'seconds': steps * STEP_MS / 1000, 'won': game.state == WON,
+            'waves': game.wave_index + (game.state == WON), 'lives': max(game.lives, 0)}
+
+
+def summarize(results):
+    scores = np.array([result['score'] for result in results])
+    seconds = np.array([result['seconds'] for result in results])
+    p10, p50, p90 = np.percentile(scores, [10, 50, 90])
+    return {
+        'sessions': len(results),
+        'win_rate': float(np.mean([result['won'] for result in results])),
+        'score_mean': float(scores.mean()),
+        'score_p10': float(p10),
+        'score_p50': float(p50),
+        'score_p90': float(p90),
+        'seconds_mean': float(seconds.mean()),
+        'seconds_p50': float(np.percentile(seconds, 50)),
+        'waves_mean': float(np.mean([result['waves'] for result in results])),
+        # How the score spread looks, for plotting
+        'score_histogram': np.histogram(scores, bins=10)[0].tolist(),
+    }
+
+
+def parse_set(text):
+    name, _, values = text.partition('=')
+    if name not in PARAMETERS and not name.startswith('value_'):
+        raise argparse.ArgumentTypeError(f'unknown parameter {name!r}, expected one of {PARAMETERS} or value_<symbol>')
+    try:
+        return name, [int(value) for value in values.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'{text!r} should look like {name}=1,2,3')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Play headless games per parameter set and compare the outcomes.')
+    parser.add_argument('--set', action='append', type=parse_set, default=[], metavar='NAME=V1,V2',
+                        help='values to try for one parameter (repeatable, the sets are crossed)')
+    parser.add_argument('--policy', action='append', choices=sorted(POLICIES),
+                        help='player policy (repeatable, default: random)')
+    parser.add_argument('--sessions', type=int, default=200, help='games per parameter set and policy')
+    parser.add_argument('--max-steps', type=int, default=DEFAULT_MAX_STEPS, help='cut a game off after this many steps')
+    parser.add_argument('--endless', action='store_true', help='keep generating waves after the listed ones')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--output', help='write the summaries as JSON to this path')
+    args = parser.parse_args()
+
+    aliens = WaveSet.load().aliens
+    for name, _ in args.set:
+        if name.startswith('value_') and name[len('value_'):] not in aliens:
+            parser.error(f'no alien type {name[len("value_"):]!r} in {WAVES_PATH}, expected one of {sorted(aliens)}')
+    names = [name for name, _ in args.set]
+    param_sets = [dict(zip(names, values)) for values in itertools.product(*(values for _, values in args.set))]
+    policies = args.policy or ['random']
+    # Every parameter set plays the same seeds, so differences come from the parameters
+    seeds = [args.seed + session for session in range(args.sessions)]
+    cases = [(params, policy) for params in param_sets for policy in policies]
+    tasks = [(params, policy, seed, args.max_steps, args.endless) for params, policy in cases for seed in seeds]
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(args.workers, initializer=init_worker) as pool:
+        chunk = max(1, len(tasks) // (args.workers * 8))
+        results = list(pool.map(play_session, tasks, chunksize=chunk))
+    elapsed = time.perf_counter() - start
+
+    summaries = []
+    print(f"{'parameters':<48} {'policy':<8} {'win':>6} {'score':>8} {'p10':>7} {'p50':>7} {'p90':>7} {'secs':>7}")
+    for index, (params, policy) in enumerate(cases):
+        summary = summarize(results[index * len(seeds):(index + 1) * len(seeds)])
+        summaries.append({'params': params, 'policy': policy, **summary})
+        label = ','.join(f'{name}={value}' for name, value in params.items()) or 'defaults'
+        print(f"{label:<48} {policy:<8} {summary['win_rate']:>6.1%} {summary['score_mean']:>8.0f}"
+              f" {summary['score_p10']:>7.0f} {summary['score_p50']:>7.0f} {summary['score_p90']:>7.0f}"
+              f" {summary['seconds_mean']:>7.1f}")
+    print(f'{len(tasks)} games in {elapsed:.1f} s on {args.workers} workers')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'meta': {'pygame': pygame.version.ver, 'seeds': [seeds[0], seeds[-1]],
+                                'max_steps': args.max_steps, 'endless': args.endless,
+                                'time': time.strftime('%Y-%m-%dT%H:%M:%S')},
+                       'results': summaries}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+# Scripted game-loop benchmarks. Run from the project root:
+#   python code/benchmark.py --output bench.json
+#   python code/benchmark.py --sweep aliens --sweep screen --output bench.json
+#   python code/benchmark.py --compare before.json after.json
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import pygame
+
+from controls import IDLE, PlayerInput, ScriptedInput
+from profiler import FrameProfiler
+from render import DirtyRenderer, FullRenderer
+from states import PLAYING
+from timestep import SimulatedClock
+from waves import grid_wave
+
+
+
+def keep_alive(game, tick):
+    # Refill lives instead of ending the run, so the board stays busy
+    game.lives = 3
+    game.state = PLAYING
+
+
+def sweep_input(fire):
+    return ScriptedInput([PlayerInput(1, fire)] * 90 + [PlayerInput(-1, fire)] * 90, loop=True)
+
+
+# Each scenario prepares a freshly reset game and returns (input source, per-tick hook)
+def full_wave(game):
+    # Whole formation alive, the player sweeps without shooting
+    return sweep_input(False), keep_alive
+
+
+def bunker_fire(game):
+    # Both sides fire as fast as the loop allows, mostly into the bunkers
+    game.player.sprite.laser_cooldown = 0
+    game.alien_laser_interval = 50
+    return sweep_input(True), keep_alive
+
+
+def near_empty(game):
+    # One alien and no bunkers left: the floor cost of a tick
+    for alien in game.aliens.alive_indices()[1:]:
+        game.aliens.kill(alien)
+    game.bunkers.empty()
+    return ScriptedInput([IDLE]), keep_alive
+
+
+def laser_storm(game):
+    # Thousands of alien lasers in flight: the projectile pool under load
+    game.player.sprite.laser_cooldown = 0
+
+    def storm(game, tick):
+        keep_alive(game, tick)
+        for _ in range(32):
+            game.alien_shoot()
+    return sweep_input(True), storm
+
+
+def game_over(game):
+    # An alien rams the player; game-over screen, home screen, then a restart
+    def ram(game, tick):
+        if game.state != PLAYING and tick % 30 == 0:
+            game.confirm()
+        if game.state == PLAYING and game.aliens:
+            game.alien_move_down(game.player.sprite.rect.top - game.aliens.bottom() + 1)
+    return ScriptedInput([IDLE]), ram
+
+
+def chain_explosions(game):
+    # Aliens blow up eight a tick through endless waves: the particle budget under load
+    game.player.sprite.laser_cooldown = 0
+    game.endless = True
+
+    def chain(game, tick):
+        keep_alive(game, tick)
+        for alien in game.aliens.alive_indices()[:8]:
+            image = game.aliens.images[game.aliens.kind[alien]]
+            game.explode(game.aliens.center(alien), game.particles.image_color(image), 12)
+            game.aliens.kill(alien)
+    return sweep_input(True), chain
+
+
+def endless_swarm(game):
+    # Deep into endless mode, where a wave is thousands of small aliens
+    game.endless = True
+    game.start_wave(len(game.wave_set.waves) + 9)
+    return sweep_input(True), keep_alive
+
+
+SCENARIOS = {
+    'full_wave': full_wave,
+    'bunker_fire': bunker_fire,
+    'near_empty': near_empty,
+    'laser_storm': laser_storm,
+    'game_over': game_over,
+    'chain_explosions': chain_explosions,
+    'endless_swarm': endless_swarm,
+}
+
+SWEEPS = {
+    'aliens': [{'rows': 7, 'cols': 11}, {'rows': 14, 'cols': 22}, {'rows': 28, 'cols': 44}],
+    'obstacles': [{'obstacles': 6}, {'obstacles': 12}, {'obstacles': 24}],
+    'screen': [{'width': 1280, 'height': 720}, {'width': 1920, 'height': 1080}, {'width': 2560, 'height': 1440}],
+}
+
+DEFAULTS = {'rows': 7, 'cols': 11, 'obstacles': 6, 'width': 1280, 'height': 720}
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    count = len(ordered)
+
+    def percentile(p):
+        return ordered[min(count - 1, int(p / 100 * count))] * 1000
+
+    return {
+        'mean_ms': sum(ordered) / count * 1000,
+        'p50_ms': percentile(50),
+        'p95_ms': percentile(95),
+        'p99_ms': percentile(99),
+        'max_ms': ordered[-1] * 1000,
+    }
+
+
+RENDERERS = {'full': FullRenderer, 'dirty': DirtyRenderer}
+
+
+def run_case(scenario, params, ticks, render, seed):
+    from main import Game
+    size = (params['width'], params['height'])
+    renderer = RENDERERS[render](pygame.display.set_mode(size)) if render else None
+    clock = SimulatedClock()
+    game = Game(*size, renderer=renderer, input_source=ScriptedInput([IDLE]), time_source=clock, seed=seed)
+    # A single grid wave of the swept size stands in for the data file's waves
+    game.wave_set.waves = [grid_wave(params['rows'], params['cols'])]
+    game.obstacle_amount = params['obstacles']
+    game.reset_game()
+    input_source, hook = SCENARIOS[scenario](game)
+    # Set on the game too so a Player rebuilt by reset_game keeps the script
+    game.input_source = game.player.sprite.input_source = input_source
+
+    profiler = FrameProfiler(capacity=ticks)
+    profiler.attach(game)
+    tick_samples = []
+    pixels = []
+    for tick in range(ticks):
+        if hook is not None:
+            hook(game, tick)
+        start = time.perf_counter()
+        if renderer is not None:
+            renderer.begin()
+        game.run()
+        if renderer is not None:
+            renderer.present()
+            pixels.append(renderer.pixels)
+        tick_samples.append(time.perf_counter() - start)
+        profiler.end_frame()
+
+    return {
+        'scenario': scenario,
+        'params': params,
+        'ticks': ticks,
+        'render': render,
+        'tick': summarize(tick_samples),
+        'pixels_per_frame': sum(pixels) / len(pixels) if pixels else 0,
+        'phases': {name: summarize(profiler.column(name).tolist()) for name in profiler.columns[:-1]
+                   if profiler.column(name).any()},
+    }
+
+
+def case_key(result):
+    params = ','.join(f'{key}={value}' for key, value in sorted(result['params'].items()))
+    return f"{result['scenario']}[{params}]"
+
+
+def compare(before_path, after_path):
+    with open(before_path) as f:
+        before = {case_key(result): result for result in json.load(f)['results']}
+    with open(after_path) as f:
+        after = {case_key(result): result for result in json.load(f)['results']}
+    print(f"{'case':<70} {'before':>9} {'after':>9} {'change':>8}")
+    for key in sorted(before.keys() & after.keys()):
+        old = before[key]['tick']['mean_ms']
+        new = after[key]['tick']['mean_ms']
+        print(f'{key:<70} {old:>8.3f}ms {new:>8.3f}ms {(new - old) / old * 100:>+7.1f}%')
+    for key in sorted(before.keys() ^ after.keys()):
+        print(f'{key:<70} only in {"before" if key in before else "after"}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Game.run on scripted scenarios.')
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='scenario to run (repeatable, default: all)')
+    parser.add_argument('--sweep', action='append', choices=sorted(SWEEPS),
+                        help='vary world scale for each scenario (repeatable)')
+    parser.add_argument('--ticks', type=int, default=600)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--renderer', choices=sorted(RENDERERS), default='full')
+    parser.add_argument('--no-render', action='store_true', help='skip the draw phase entirely')
+    parser.add_argument('--output', help='write results as JSON to this path')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='diff two result files')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    # Draw into a real display-format surface without opening a window
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.display.init()
+    pygame.font.init()
+    render = None if args.no_render else args.renderer
+
+    cases = [dict(DEFAULTS)]
+    for sweep in args.sweep or []:
+        cases += [{**DEFAULTS, **point} for point in SWEEPS[sweep] if {**DEFAULTS, **point} not in cases]
+
+    results = []
+    for scenario in args.scenario or list(SCENARIOS):
+        for params in cases:
+            result = run_case(scenario, params, args.ticks, render, args.seed)
+            results.append(result)
+            tick = result['tick']
+            print(f"{case_key(result):<70} mean {tick['mean_ms']:7.3f} ms  p95 {tick['p95_ms']:7.3f} ms"
+                  f"  {result['pixels_per_frame'] / 1000:8.1f} kpx/frame")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'meta': {
+                    'python': sys.version.split()[0],
+                    'pygame': pygame.version.ver,
+                    'platform': platform.platform(),
+                    'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                },
+                'results': results,
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
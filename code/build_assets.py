@@ -0,0 +1,172 @@
+# Offline build step: bakes graphics/ into a single asset pack of raw pixels.
+# Run from the project root:
+#   python code/build_assets.py --size 1280x720 --compare
+import argparse
+import glob
+import json
+import os
+import time
+
+import numpy as np
+from PIL import Image
+
+from asset_pack import ALIGN, HEADER, MAGIC, PACK_PATH, AssetPack, data_start, pack_key
+
+# Full-screen images are stored at the target resolution so nothing is scaled at runtime
+FULLSCREEN_IMAGES = {'graphics/background.png', 'graphics/home.gif'}
+
+
+def bgra_bytes(img):
+    # Matches the display format convert_alpha() produces on little-endian devices
+    return img.convert('RGBA').tobytes('raw', 'BGRA')
+
+
+def palette_frame(img):
+    # GIF frames have at most 256 colours, keep them 8-bit when they are opaque
+    rgba = np.asarray(img.convert('RGBA'))
+    if rgba[..., 3].min() < 255:
+        return None
+    packed = (rgba[..., 0].astype(np.uint32) << 16) | (rgba[..., 1].astype(np.uint32) << 8) | rgba[..., 2]
+    colors, indices = np.unique(packed, return_inverse=True)
+    if len(colors) > 256:
+        return None
+    palette = np.zeros((256, 3), np.uint8)
+    palette[:len(colors)] = np.stack([colors >> 16, colors >> 8, colors], axis=1) & 0xff
+    return indices.astype(np.uint8).tobytes(), palette.tobytes()
+
+
+class PackWriter:
+    def __init__(self):
+        self.index = {}
+        self.chunks = []
+        self.length = 0
+
+    def add_bytes(self, data):
+        padding = -self.length % ALIGN
+        if padding:
+            self.chunks.append(bytes(padding))
+            self.length += padding
+        offset = self.length
+        self.chunks.append(data)
+        self.length += len(data)
+        return offset
+
+    def image_entry(self, img, allow_palette=False):
+        indexed = palette_frame(img) if allow_palette else None
+        if indexed is not None:
+            pixels, palette = indexed
+            return {'format': 'P', 'size': list(img.size),
+                    'palette': self.add_bytes(palette), 'offset': self.add_bytes(pixels)}
+        return {'format': 'BGRA', 'size': list(img.size), 'offset': self.add_bytes(bgra_bytes(img))}
+
+    def add(self, path, size):
+        key = pack_key(path)
+        with Image.open(path) as img:
+            frame_count = getattr(img, 'n_frames', 1)
+            entries = []
+            for frame in range(frame_count):
+                img.seek(frame)
+                frame_img = img.convert('RGBA')
+                if key in FULLSCREEN_IMAGES and frame_img.size != size:
+                    frame_img = frame_img.resize(size, Image.Resampling.NEAREST)
+                entries.append(self.image_entry(frame_img, allow_palette=frame_count > 1))
+        self.index[key] = {'frames': entries} if frame_count > 1 else entries[0]
+
+    def write(self, path):
+        index = json.dumps(self.index, separators=(',', ':')).encode()
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(index)))
+            f.write(index)
+            f.write(bytes(data_start(len(index)) - HEADER.size - len(index)))
+            for chunk in self.chunks:
+                f.write(chunk)
+        return os.path.getsize(path)
+
+
+def source_images():
+    return sorted(glob.glob('./graphics/*.png') + glob.glob('./graphics/*.gif'))
+
+
+def load_animation(path, pack=None):
+    # The home screen encodes every frame into its compact store when first
+    # shown, from the GIF or from the pack's frames; count all of it
+    from home_screen import HomeScreenAnimation
+    animation = HomeScreenAnimation(path, pack)
+    animation.next_frame()
+    animation.wait()
+
+
+def legacy_load(size):
+    # Mirrors what main.py does without a pack: decode, convert, rescale
+    import pygame
+    for path in source_images():
+        key = pack_key(path)
+        with Image.open(path) as img:
+            frame_count = getattr(img, 'n_frames', 1)
+        if frame_count > 1:
+            load_animation(path)
+        elif key == 'graphics/background.png':
+            pygame.transform.scale(pygame.image.load(path).convert(), size)
+        else:
+            pygame.image.load(path).convert_alpha()
+
+
+def pack_load(path):
+    # Mirrors what main.py does with a pack: map, convert the background, encode the animation
+    pack = AssetPack(path)
+    for key, entry in pack.index.items():
+        if 'frames' in entry:
+            load_animation(key, pack)
+        elif key == 'graphics/background.png':
+            pack.surface(key).convert()
+        else:
+            pack.surface(key)
+    return pack
+
+
+def compare(path, size, repeats):
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame
+    pygame.display.init()
+    pygame.display.set_mode(size)
+    report = {}
+    for name, load in (('legacy', lambda: legacy_load(size)), ('pack', lambda: pack_load(path))):
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            load()
+            timings.append((time.perf_counter() - start) * 1000)
+        report[name] = {'best_ms': min(timings), 'mean_ms': sum(timings) / len(timings)}
+    report['speedup'] = report['legacy']['best_ms'] / report['pack']['best_ms']
+    pygame.display.quit()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bake graphics/ into a memory-mappable asset pack.')
+    parser.add_argument('--size', default='1280x720', help='target screen resolution, WIDTHxHEIGHT')
+    parser.add_argument('--output', default=PACK_PATH)
+    parser.add_argument('--compare', action='store_true', help='time startup loading against the PNG/GIF path')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--report', help='write the comparison as JSON to this path')
+    args = parser.parse_args()
+    size = tuple(int(n) for n in args.size.lower().split('x'))
+
+    writer = PackWriter()
+    for path in source_images():
+        writer.add(path, size)
+    pack_size = writer.write(args.output)
+    print(f'wrote {args.output}: {len(writer.index)} assets, {pack_size / 1024 / 1024:.1f} MiB')
+
+    if args.compare:
+        report = compare(args.output, size, args.repeats)
+        for name in ('legacy', 'pack'):
+            print(f"{name:>7}: best {report[name]['best_ms']:8.2f} ms  mean {report[name]['mean_ms']:8.2f} ms")
+        print(f"speedup: {report['speedup']:.1f}x")
+        if args.report:
+            with open(args.report, 'w') as f:
+                json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+import time
+from collections import deque, namedtuple
+
+import pygame
+
+# What the player wants to do this tick: move is negative (left), 0 or positive (right).
+# Keyboard and touch add up, so live input can reach -2 or 2.
+PlayerInput = namedtuple('PlayerInput', 'move fire')
+IDLE = PlayerInput(0, False)
+
+
+class LiveInput:
+    # Keyboard plus single-pointer touch, read from pygame every tick.
+    # to_logical maps the pointer from display to game coordinates.
+    def __init__(self, screen_width, screen_height, to_logical=None):
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.to_logical = to_logical
+
+    def poll(self):
+        keys = pygame.key.get_pressed()
+        move = 0
+        if keys[pygame.K_RIGHT]:
+            move += 1
+        elif keys[pygame.K_LEFT]:
+            move -= 1
+        fire = keys[pygame.K_SPACE]
+
+        if pygame.mouse.get_pressed()[0]:  # Detect touch
+            touch_x, touch_y = pygame.mouse.get_pos()
+            if self.to_logical is not None:
+                touch_x, touch_y = self.to_logical((touch_x, touch_y))
+            if touch_x < self.screen_width / 2:
+                move -= 1
+            elif touch_x > self.screen_width / 2 and touch_y < self.screen_height * 0.8:
+                move += 1
+            elif touch_y > self.screen_height * 0.8:  # Bottom 20% of the screen is for shooting
+                fire = True
+        return PlayerInput(move, fire)
+
+
+class EventInput:
+    # Built from the event queue instead of polled state, so nothing pressed
+    # between two ticks is lost: a tap that starts and ends in between still
+    # moves or fires on the next tick, and a fire press is held for
+    # fire_buffer ticks so one made just before the cooldown ends still
+    # fires. Any number of fingers count; each acts on the zone it is in,
+    # the same zones LiveInput uses. Mouse events SDL synthesizes from touch
+    # are ignored, real mouse clicks act as one more pointer.
+    def __init__(self, screen_width, screen_height, to_logical=None, fire_buffer=6):
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.to_logical = to_logical
+        self.fire_buffer = fire_buffer
+        self.keys = set()
+        self.pointers = {}
+        self.tapped_move = 0
+        self.fire_ticks = 0
+        # Press times waiting for a tick, then for the frame that shows them
+        self.pending = []
+        self.in_flight = []
+        self.latency = LatencyMeter()
+
+    def zone(self, pos):
+        x, y = self.to_logical(pos) if self.to_logical is not None else pos
+        if x < self.screen_width / 2:
+            return 'left'
+        if y < self.screen_height * 0.8:
+            return 'right'
+        return 'fire'
+
+    def finger_pos(self, event):
+        # Finger coordinates are 0-1 across the window
+        width, height = pygame.display.get_surface().get_size()
+        return event.x * width, event.y * height
+
+    def press(self, zone):
+        self.pending.append(time.perf_counter())
+        if zone == 'fire':
+            self.fire_ticks = self.fire_buffer
+        else:
+            self.tapped_move = -1 if zone == 'left' else 1
+
+    def handle(self, event):
+        if event.type == pygame.KEYDOWN and event.key in KEY_ZONES:
+            self.keys.add(event.key)
+            self.press(KEY_ZONES[event.key])
+        elif event.type == pygame.KEYUP:
+            self.keys.discard(event.key)
+        elif event.type == pygame.FINGERDOWN:
+            zone = self.pointers[event.finger_id] = self.zone(self.finger_pos(event))
+            self.press(zone)
+        elif event.type == pygame.FINGERMOTION and event.finger_id in self.pointers:
+            self.pointers[event.finger_id] = self.zone(self.finger_pos(event))
+        elif event.type == pygame.FINGERUP:
+            self.pointers.pop(event.finger_id, None)
+        elif event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEMOTION, pygame.MOUSEBUTTONUP):
+            if getattr(event, 'touch', False):
+                return
+            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                zone = self.pointers['mouse'] = self.zone(event.pos)
+                self.press(zone)
+            elif event.type == pygame.MOUSEMOTION and 'mouse' in self.pointers:
+                self.pointers['mouse'] = self.zone(event.pos)
+            elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+                self.pointers.pop('mouse', None)
+
+    def poll(self):
+        keys = self.keys
+        move = 1 if pygame.K_RIGHT in keys else -1 if pygame.K_LEFT in keys else 0
+        fire = pygame.K_SPACE in keys or self.fire_ticks > 0
+        held = bool(move)
+        for zone in self.pointers.values():
+            if zone == 'fire':
+                fire = True
+            else:
+                move += -1 if zone == 'left' else 1
+                held = True
+        if not held:
+            move = self.tapped_move  # Pressed and let go since the last tick
+        self.tapped_move = 0
+        self.fire_ticks = max(0, self.fire_ticks - 1)
+        self.in_flight += self.pending
+        self.pending = []
+        return PlayerInput(max(-2, min(2, move)), fire)
+
+    def presented(self):
+        # Call right after a frame reaches the display: every press a tick
+        # has consumed since the last frame is now on screen
+        if self.in_flight:
+            now = time.perf_counter()
+            for pressed in self.in_flight:
+                self.latency.record(now - pressed)
+            self.in_flight = []
+
+    def clear(self):
+        # Outside play nothing consumes presses, so they are not held over
+        self.tapped_move = 0
+        self.fire_ticks = 0
+        self.pending = []
+        self.in_flight = []
+
+
+KEY_ZONES = {pygame.K_LEFT: 'left', pygame.K_RIGHT: 'right', pygame.K_SPACE: 'fire'}
+
+
+class LatencyMeter:
+    # The last `capacity` input-to-display latencies, in seconds
+    def __init__(self, capacity=512):
+        self.samples = deque(maxlen=capacity)
+
+    def __len__(self):
+        return len(self.samples)
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+
+    def stats(self):
+        # Milliseconds: mean, p50, p95 and max
+        if not self.samples:
+            return {}
+        ordered = sorted(self.samples)
+
+        def percentile(p):
+            return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000
+
+        return {'count': len(ordered), 'mean': sum(ordered) / len(ordered) * 1000,
+                'p50': percentile(50), 'p95': percentile(95), 'max': ordered[-1] * 1000}
+
+
+class ScriptedInput:
+    # Replays a fixed list of PlayerInputs, holding the last one once it runs out
+    def __init__(self, frames, loop=False):
+        self.frames = list(frames) or [IDLE]
+        self.loop = loop
+        self.index = 0
+
+    def poll(self):
+        if self.index >= len(self.frames):
+            self.index = 0 if self.loop else len(self.frames) - 1
+        frame = self.frames[self.index]
+        self.index += 1
+        return frame
+
+
+# Inputs pack into one byte each: move + 2 in the low three bits, fire in bit 3
+def encode_input(player_input):
+    return (player_input.move + 2) | (bool(player_input.fire) << 3)
+
+
+INPUTS = {encode_input(PlayerInput(move, fire)): PlayerInput(move, fire)
+          for move in range(-2, 3) for fire in (False, True)}
+
+
+def decode_inputs(data):
+    return [INPUTS[byte] for byte in data]
+
+
+class InputRecorder:
+    # Passes another source through, keeping every polled input as one byte
+    def __init__(self, source):
+        self.source = source
+        self.inputs = bytearray()
+
+    def poll(self):
+        player_input = self.source.poll()
+        self.inputs.append(encode_input(player_input))
+        return player_input
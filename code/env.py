@@ -0,0 +1,267 @@
+# Gym-style environments over headless games, for automated play. The
+# reset/step signatures follow gymnasium, but nothing here imports it.
+#   env = GameEnv(observation='entities')
+#   observation, info = env.reset(seed=1)
+#   observation, reward, terminated, truncated, info = env.step(RIGHT_FIRE)
+#
+#   envs = VectorGameEnv(64, workers=4, observation='pixels', pixel_size=(160, 90))
+#   observations, infos = envs.reset(seed=1)
+#   observations, rewards, terminated, truncated, infos = envs.step(actions)
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+import pygame
+
+from controls import PlayerInput
+from render import FullRenderer
+from states import LOST, PLAYING, WON
+from timestep import SimulatedClock
+
+NOOP, LEFT, RIGHT, FIRE, LEFT_FIRE, RIGHT_FIRE = range(6)
+ACTIONS = [PlayerInput(0, False), PlayerInput(-1, False), PlayerInput(1, False),
+           PlayerInput(0, True), PlayerInput(-1, True), PlayerInput(1, True)]
+
+# Entity observations: one row per thing on screen, centre and size in game
+# pixels. Rows past the last entity are zero, kind EMPTY. Every field is
+# float32, so the rows also view as one (n, 5) array for a network.
+EMPTY, PLAYER, ALIEN, PLAYER_LASER, ALIEN_LASER, EXTRA, BUNKER = range(7)
+ENTITY_DTYPE = np.dtype([('kind', np.float32), ('x', np.float32), ('y', np.float32),
+                         ('width', np.float32), ('height', np.float32)])
+
+
+class ActionInput:
+    # The input source a GameEnv drives: whatever action was set last
+    def __init__(self):
+        self.action = ACTIONS[NOOP]
+
+    def poll(self):
+        return self.action
+
+
+def pixel_buffer(size):
+    # Pixels for a surface that numpy owns: RGBX rows, so [..., :3] is RGB
+    width, height = size
+    return np.zeros((height, width, 4), np.uint8)
+
+
+class GameEnv:
+    # One headless game. observation is 'entities' (a structured array of
+    # max_entities rows) or 'pixels' (a height x width x 3 view of the frame).
+    # Observations are views into buffers the env keeps writing to, so copy
+    # one to keep it past the next step. frame_skip repeats each action for
+    # that many simulation steps; the reward is the score gained meanwhile.
+    def __init__(self, width=1280, height=720, observation='entities', max_entities=512, pixel_size=None,
+                 frame_skip=1, max_steps=None, endless=False, buffer=None):
+        from main import Game
+        if observation not in ('entities', 'pixels'):
+            raise ValueError(f'observation must be entities or pixels, not {observation!r}')
+        pygame.font.init()
+        self.observation_kind = observation
+        self.frame_skip = frame_skip
+        self.max_steps = max_steps
+        self.input = ActionInput()
+        self.pixel_size = pixel_size or (width, height)
+
+        renderer = None
+        if observation == 'pixels':
+            # buffer lets a VectorGameEnv hand out its own slice, so the
+            # stacked observations never have to be gathered
+            self.pixels = pixel_buffer(self.pixel_size) if buffer is None else buffer
+            self.pixel_surface = pygame.image.frombuffer(self.pixels, self.pixel_size, 'RGBX')
+            if self.pixel_size == (width, height):
+                self.frame_surface = self.pixel_surface
+            else:
+                # Drawn at game size, then scaled straight into the observation
+                self.frame = pixel_buffer((width, height))
+                self.frame_surface = pygame.image.frombuffer(self.frame, (width, height), 'RGBX')
+            renderer = FullRenderer(self.frame_surface)
+            self.view = self.pixels[..., :3]
+        else:
+            self.entities = np.zeros(max_entities, ENTITY_DTYPE) if buffer is None else buffer
+            self.view = self.entities
+
+        self.game = Game(width, height, renderer=renderer, input_source=self.input,
+                         time_source=SimulatedClock())
+        self.game.endless = endless
+        self.steps = 0
+        # Entity rows written last time, the ones to clear next time
+        self.filled = len(self.entities) if observation == 'entities' else 0
+
+    def reset(self, seed=None):
+        self.game.reset_game(seed)
+        self.steps = 0
+        return self.observe(), self.info()
+
+    def step(self, action):
+        game = self.game
+        self.input.action = ACTIONS[action]
+        score = game.score
+        for _ in range(self.frame_skip):
+            game.step()
+            if game.state != PLAYING:
+                break
+        self.steps += 1
+        terminated = game.state in (LOST, WON)
+        truncated = not terminated and self.max_steps is not None and self.steps >= self.max_steps
+        return self.observe(), game.score - score, terminated, truncated, self.info()
+
+    def info(self):
+        game = self.game
+        return {'score': game.score, 'lives': game.lives, 'wave': game.wave_index, 'won': game.state == WON}
+
+    def observe(self):
+        if self.observation_kind == 'pixels':
+            self.render()
+        else:
+            self.write_entities(self.entities)
+        return self.view
+
+    def render(self):
+        renderer = self.game.renderer
+        renderer.begin()
+        self.game.draw()
+        renderer.present()
+        if self.frame_surface is not self.pixel_surface:
+            pygame.transform.scale(self.frame_surface, self.pixel_size, self.pixel_surface)
+
+    def write_entities(self, out):
+        game = self.game
+        # (kind, left, top, width, height) blocks, made centres at the end
+        sprites = [game.player.sprite] + game.extra.sprites() + game.bunkers.sprites()
+        kinds = [PLAYER] + [EXTRA] * len(game.extra) + [BUNKER] * (len(sprites) - 1 - len(game.extra))
+        blocks = [np.array([(kind, *sprite.rect) for kind, sprite in zip(kinds, sprites)], np.float32)]
+        aliens = game.aliens
+        if aliens:
+            alive = aliens.alive_indices()
+            blocks.append(np.column_stack((np.full(len(alive), ALIEN), aliens.x[alive] + aliens.offset_x,
+                                           aliens.y[alive] + aliens.bob[alive] + aliens.offset_y,
+                                           aliens.width[alive], aliens.height[alive])))
+        for kind, lasers in ((ALIEN_LASER, game.alien_lasers), (PLAYER_LASER, game.player.sprite.lasers)):
+            if lasers:
+                alive = np.flatnonzero(lasers.alive)
+                blocks.append(np.column_stack((np.full(len(alive), kind), lasers.x[alive], lasers.y[alive],
+                                               np.full(len(alive), lasers.width), np.full(len(alive), lasers.height))))
+        # Whatever does not fit is dropped, lasers first
+        rows = np.concatenate(blocks)[:len(out)]
+        rows[:, 1:3] += rows[:, 3:5] / 2
+        table = out.view(np.float32).reshape(len(out), 5)
+        count = len(rows)
+        table[:count] = rows
+        table[count:self.filled] = 0
+        self.filled = count
+
+
+class VectorGameEnv:
+    # num_envs games stepped by one call. Observations are stacked in one
+    # array, (num_envs, ...), that every game writes its own row of; with
+    # workers the games are split over that many processes and the array
+    # lives in shared memory, so only actions and rewards cross the pipes.
+    # A game that ends is reset straight away; its last info has final=True
+    # and a copy of the observation it ended on as final_observation.
+    def __init__(self, num_envs, workers=0, **env_options):
+        self.num_envs = num_envs
+        shape, dtype = observation_layout(num_envs, env_options)
+        self.workers = []
+        if workers:
+            self.memory = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * dtype.itemsize))
+            self.buffer = np.ndarray(shape, dtype, buffer=self.memory.buf)
+            context = multiprocessing.get_context('spawn')
+            bounds = np.linspace(0, num_envs, min(workers, num_envs) + 1).astype(int)
+            for first, last in zip(bounds[:-1], bounds[1:]):
+                connection, child = context.Pipe()
+                process = context.Process(target=worker, daemon=True,
+                                          args=(child, self.memory.name, shape, dtype, first, last, env_options))
+                process.start()
+                self.workers.append((connection, process, first, last))
+            self.envs = None
+        else:
+            self.memory = None
+            self.buffer = np.zeros(shape, dtype)
+            self.envs = [GameEnv(buffer=self.buffer[index], **env_options) for index in range(num_envs)]
+        self.observations = self.buffer[..., :3] if env_options.get('observation') == 'pixels' else self.buffer
+
+    def reset(self, seed=None):
+        seeds = [None if seed is None else seed + index for index in range(self.num_envs)]
+        if self.envs is not None:
+            infos = [env.reset(seed)[1] for env, seed in zip(self.envs, seeds)]
+        else:
+            for connection, _, first, last in self.workers:
+                connection.send(('reset', seeds[first:last]))
+            infos = [info for connection, *_ in self.workers for info in connection.recv()]
+        return self.observations, stack_infos(infos)
+
+    def step(self, actions):
+        actions = np.asarray(actions).tolist()
+        if self.envs is not None:
+            results = step_envs(self.envs, actions)
+        else:
+            for connection, _, first, last in self.workers:
+                connection.send(('step', actions[first:last]))
+            results = [result for connection, *_ in self.workers for result in connection.recv()]
+        rewards, terminated, truncated, infos = zip(*results)
+        return (self.observations, np.array(rewards, np.int64), np.array(terminated), np.array(truncated),
+                stack_infos(infos))
+
+    def close(self):
+        for connection, process, _, _ in self.workers:
+            connection.send(('close', None))
+            process.join()
+        self.workers = []
+        if self.memory is not None:
+            self.observations = self.buffer = None
+            self.memory.close()
+            self.memory.unlink()
+            self.memory = None
+
+
+def observation_layout(num_envs, env_options):
+    if env_options.get('observation') == 'pixels':
+        width, height = env_options.get('pixel_size') or (env_options.get('width', 1280), env_options.get('height', 720))
+        return (num_envs, height, width, 4), np.dtype(np.uint8)
+    return (num_envs, env_options.get('max_entities', 512)), ENTITY_DTYPE
+
+
+def step_envs(envs, actions):
+    results = []
+    for env, action in zip(envs, actions):
+        observation, reward, terminated, truncated, info = env.step(action)
+        if terminated or truncated:
+            # The reset writes the next episode over the observation buffer
+            info['final'] = True
+            info['final_observation'] = observation.copy()
+            env.reset()
+        results.append((reward, terminated, truncated, info))
+    return results
+
+
+def stack_infos(infos):
+    stacked = {}
+    for key in set().union(*infos) | {'final', 'final_observation'}:
+        if key == 'final_observation':
+            # Only the games that just ended have one, the rest are None
+            column = np.empty(len(infos), object)
+            for index, info in enumerate(infos):
+                column[index] = info.get(key)
+        else:
+            column = np.array([info.get(key, False) for info in infos])
+        stacked[key] = column
+    return stacked
+
+
+def worker(connection, memory_name, shape, dtype, first, last, env_options):
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    memory = shared_memory.SharedMemory(name=memory_name)
+    buffer = np.ndarray(shape, dtype, buffer=memory.buf)
+    envs = [GameEnv(buffer=buffer[index], **env_options) for index in range(first, last)]
+    while True:
+        command, data = connection.recv()
+        if command == 'reset':
+            connection.send([env.reset(seed)[1] for env, seed in zip(envs, data)])
+        elif command == 'step':
+            connection.send(step_envs(envs, data))
+        else:
+            break
+    del envs, buffer
+    memory.close()
@@ -0,0 +1,158 @@
+import math
+
+import numpy as np
+import pygame
+
+from spatial_hash import SpatialHash
+
+
+class AlienFormation:
+    # The whole alien grid as parallel arrays. Sideways steps and move-downs
+    # are shared by every alien, so they live in one (offset_x, offset_y) and
+    # only the bob is tracked per alien. Positions, the spatial hash and the
+    # bounding box are all kept in formation coordinates, so moving the
+    # formation never touches them.
+    def __init__(self, bob_height=1, bob_speed=0.1, cell_size=64):
+        self.bob_height = bob_height
+        self.bob_speed = bob_speed
+        self.grid = SpatialHash(cell_size)
+        self.images = []
+        self.image_kinds = {}
+
+        self.kind = np.zeros(0, np.int32)
+        self.x = np.zeros(0, np.int64)
+        self.y = np.zeros(0, np.int64)
+        self.width = np.zeros(0, np.int64)
+        self.height = np.zeros(0, np.int64)
+        self.value = np.zeros(0, np.int64)
+        self.alive = np.zeros(0, bool)
+        self.phase = np.zeros(0, np.float64)
+        self.bob = np.zeros(0, np.int64)
+
+        self.offset_x = 0
+        self.offset_y = 0
+        # Where the formation was one simulation step ago, for interpolation
+        self.previous = None
+        self.bob_low = 0
+        self.bob_high = 0
+        self.count = 0
+        self.left = 0
+        self.right = 0
+
+    def __len__(self):
+        return self.count
+
+    def spawn(self, images, xs, ys, values, phases=None):
+        kinds = []
+        for image in images:
+            kind = self.image_kinds.get(id(image))
+            if kind is None:
+                kind = self.image_kinds[id(image)] = len(self.images)
+                self.images.append(image)
+            kinds.append(kind)
+
+        first = len(self.alive)
+        count = len(kinds)
+        sizes = np.array([self.images[kind].get_size() for kind in kinds], np.int64).reshape(count, 2)
+        # New aliens join at the formation's current position
+        xs = np.asarray(xs, np.int64) - self.offset_x
+        ys = np.asarray(ys, np.int64) - self.offset_y
+        self.kind = np.concatenate([self.kind, np.asarray(kinds, np.int32)])
+        self.x = np.concatenate([self.x, xs])
+        self.y = np.concatenate([self.y, ys])
+        self.width = np.concatenate([self.width, sizes[:, 0]])
+        self.height = np.concatenate([self.height, sizes[:, 1]])
+        self.value = np.concatenate([self.value, np.asarray(values, np.int64)])
+        self.alive = np.concatenate([self.alive, np.ones(count, bool)])
+        self.phase = np.concatenate([self.phase, np.zeros(count) if phases is None else np.asarray(phases, np.float64)])
+        self.bob = np.concatenate([self.bob, np.zeros(count, np.int64)])
+
+        for index in range(first, first + count):
+            self.grid.insert(index, self.local_rect(index))
+        self.count += count
+        self.update_bounds()
+
+    def local_rect(self, index):
+        return pygame.Rect(int(self.x[index]), int(self.y[index]), int(self.width[index]), int(self.height[index]))
+
+    def rect(self, index):
+        return pygame.Rect(int(self.x[index]) + self.offset_x,
+                           int(self.y[index] + self.bob[index]) + self.offset_y,
+                           int(self.width[index]), int(self.height[index]))
+
+    def update_bounds(self):
+        if self.count:
+            alive = self.alive
+            self.left = int(self.x[alive].min())
+            self.right = int((self.x[alive] + self.width[alive]).max())
+
+    def left_edge(self):
+        return self.left + self.offset_x
+
+    def right_edge(self):
+        return self.right + self.offset_x
+
+    def bottom(self):
+        alive = self.alive
+        return int((self.y[alive] + self.bob[alive] + self.height[alive]).max()) + self.offset_y
+
+    def save_position(self):
+        self.previous = (self.offset_x, self.offset_y, self.bob.copy())
+
+    def bounds(self):
+        # Screen rect around every live alien, bob included
+        alive = self.alive
+        top = int((self.y[alive] + self.bob[alive]).min()) + self.offset_y
+        return pygame.Rect(self.left_edge(), top, self.right - self.left, self.bottom() - top)
+
+    def update(self, direction):
+        self.offset_x += direction
+        # Bobbing, rounded into whole pixels the same way a Rect would
+        self.phase += self.bob_speed
+        self.bob += np.floor(np.sin(self.phase) * self.bob_height + 0.5).astype(np.int64)
+        self.bob_low = int(self.bob.min()) if len(self.bob) else 0
+        self.bob_high = int(self.bob.max()) if len(self.bob) else 0
+
+    def move_down(self, distance):
+        self.offset_y += distance
+
+    def collide(self, rect):
+        # Broadphase in formation coordinates, widened by the spread of the bob
+        query = pygame.Rect(rect.left - self.offset_x, rect.top - self.offset_y - self.bob_high,
+                            rect.width, rect.height + self.bob_high - self.bob_low)
+        return sorted(index for index in self.grid.query(query) if rect.colliderect(self.rect(index)))
+
+    def kill(self, index):
+        self.alive[index] = False
+        self.count -= 1
+        self.grid.remove(index)
+        # The bounding box only changes when an alien on its edge dies
+        if self.x[index] == self.left or self.x[index] + self.width[index] == self.right:
+            self.update_bounds()
+
+    def hit(self, rect):
+        hits = self.collide(rect)
+        for index in hits:
+            self.kill(index)
+        return hits
+
+    def alive_indices(self):
+        return np.flatnonzero(self.alive)
+
+    def center(self, index):
+        return self.rect(index).center
+
+    def draw(self, renderer, alpha=1.0):
+        alive = self.alive_indices()
+        offset_x, offset_y, bob = self.offset_x, self.offset_y, self.bob[alive]
+        if alpha < 1 and self.previous is not None and len(self.previous[2]) == len(self.bob):
+            # Blend with the last step and round the way a Rect would
+            previous_x, previous_y, previous_bob = self.previous
+            offset_x = math.floor(previous_x + (offset_x - previous_x) * alpha + 0.5)
+            offset_y = math.floor(previous_y + (offset_y - previous_y) * alpha + 0.5)
+            previous_bob = previous_bob[alive]
+            bob = np.floor(previous_bob + (bob - previous_bob) * alpha + 0.5).astype(np.int64)
+        xs = (self.x[alive] + offset_x).tolist()
+        ys = (self.y[alive] + bob + offset_y).tolist()
+        images = self.images
+        renderer.blits([(images[kind], (x, y)) for kind, x, y in zip(self.kind[alive].tolist(), xs, ys)])
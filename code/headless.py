@@ -0,0 +1,27 @@
+import pygame
+
+from controls import ScriptedInput, IDLE
+from render import FullRenderer
+from timestep import SimulatedClock
+
+
+def create_headless_game(width=1280, height=720, input_source=None, render=False, seed=None):
+    # No window, no mixer: sprites keep unconverted surfaces and sounds are silent.
+    # With render=True the game draws into an off-screen surface instead.
+    from main import Game
+    pygame.font.init()
+    renderer = FullRenderer(pygame.Surface((width, height))) if render else None
+    return Game(width, height, renderer=renderer,
+                input_source=input_source or ScriptedInput([IDLE]),
+                time_source=SimulatedClock(), seed=seed)
+
+
+def run_headless(game, ticks):
+    # Steps the game as fast as the CPU allows
+    for _ in range(ticks):
+        if game.renderer is not None:
+            game.renderer.begin()
+        game.run()
+        if game.renderer is not None:
+            game.renderer.present()
+    return game
@@ -0,0 +1,229 @@
+import threading
+import zlib
+from collections import namedtuple
+
+import numpy as np
+import pygame
+
+# A key frame every this many frames bounds the work of jumping to any frame
+KEY_INTERVAL = 16
+FRAME_BUDGET = 16 * 1024 * 1024
+
+# indices is zlib-compressed 8-bit palette indices: the whole frame for a
+# key frame, else XORed with the frame before, which is mostly zeros
+CompactFrame = namedtuple('CompactFrame', 'key palette indices')
+
+
+class HomeScreenAnimation:
+    # Frames are stored compactly and decoded on demand into one 8-bit
+    # surface. Nothing is loaded until the first next_frame(); frame 0 is
+    # decoded on the calling thread so it can be shown straight away, the
+    # rest by a background worker. max_bytes caps everything resident, the
+    # decoded frame included: frames past it are not kept and the animation
+    # loops over the ones that fit, or shows nothing if not even the first
+    # does. release() drops it all while the home screen is not on show.
+    def __init__(self, path, pack=None, max_bytes=FRAME_BUDGET):
+        self.path = path
+        self.pack = pack
+        self.max_bytes = max_bytes
+        self.worker = None
+        self.generation = 0
+        self.release()
+
+    def release(self):
+        # A worker still decoding sees the generation change and stops
+        self.generation += 1
+        self.frames = []
+        self.palettes = []
+        self.started = False
+        self.frame_count = 0
+        self.current_frame = 0
+        self.done = False
+        self.truncated = False
+        self.stored_bytes = 0
+        self.pixels = None
+        self.surface = None
+        self.surface_palette = None
+        self.shown = None
+
+    @property
+    def loaded(self):
+        return self.frame_count > 0
+
+    def resident_bytes(self):
+        # Stored frames plus the one decoded frame
+        return self.stored_bytes + (self.pixels.nbytes if self.pixels is not None else 0)
+
+    def start(self):
+        self.release()
+        self.started = True
+        encoder = FrameEncoder(self.palettes)
+        if self.pack is not None and self.path in self.pack:
+            # Prebaked frames are mostly 8-bit already, only the deltas are left to take
+            source = self.pack.frames(self.path)
+            encode = encoder.encode_surface
+        else:
+            from PIL import Image  # Only needed to decode, a prebaked pack skips it
+            source = Image.open(self.path)
+            encode = encoder.encode
+        self.frame_count = len(source) if isinstance(source, list) else getattr(source, 'n_frames', 1)
+        if self.store(self.frames, encode(source, 0)) and self.frame_count > 1:
+            self.worker = threading.Thread(target=self.decode_remaining, args=(source, encode, self.generation),
+                                           daemon=True)
+            self.worker.start()
+        else:
+            close(source)
+            self.frame_count = len(self.frames)
+            self.done = True
+
+    def store(self, frames, frame):
+        # The one decoded frame is resident too, so it counts against the cap
+        width, height = self.palettes[frame.palette][1]
+        if self.stored_bytes + len(frame.indices) + width * height > self.max_bytes:
+            self.truncated = True
+            return False
+        self.stored_bytes += len(frame.indices)
+        # list.append is atomic, so the main thread can read self.frames freely
+        frames.append(frame)
+        return True
+
+    def decode_remaining(self, source, encode, generation):
+        frames = self.frames
+        for index in range(1, self.frame_count):
+            frame = encode(source, index)
+            if generation != self.generation or not self.store(frames, frame):
+                break
+        close(source)
+        if generation == self.generation:
+            self.frame_count = len(frames)
+            self.done = True
+
+    def wait(self, timeout=None):
+        if self.worker is not None:
+            self.worker.join(timeout)
+
+    def frame(self, index):
+        frame = self.frames[index]
+        if index != self.shown:
+            if self.shown is None or index != self.shown + 1 or frame.key:
+                # Back to the nearest key frame, then forward through the deltas
+                first = index
+                while not self.frames[first].key:
+                    first -= 1
+            else:
+                first = index
+            for position in range(first, index + 1):
+                self.apply(self.frames[position])
+            self.shown = index
+        return self.surface
+
+    def apply(self, frame):
+        width, height = self.palettes[frame.palette][1]
+        if self.pixels is None or self.pixels.shape != (height, width):
+            self.pixels = np.zeros((height, width), np.uint8)
+            self.surface = pygame.image.frombuffer(self.pixels, (width, height), 'P')
+            self.surface_palette = None
+        data = np.frombuffer(zlib.decompress(frame.indices), np.uint8).reshape(height, width)
+        if frame.key:
+            np.copyto(self.pixels, data)
+        else:
+            np.bitwise_xor(self.pixels, data, out=self.pixels)
+        if self.surface_palette != frame.palette:
+            colors, size, colorkey = self.palettes[frame.palette]
+            self.surface.set_palette(colors)
+            self.surface.set_colorkey(colorkey)
+            self.surface_palette = frame.palette
+
+    @property
+    def version(self):
+        # Changes whenever the surface next_frame() hands out is repainted
+        return self.shown
+
+    def next_frame(self, steps=1):
+        # The frame to show now; the animation then moves on one GIF frame per
+        # simulation step, so it plays at the same speed at any refresh rate
+        if not self.started:
+            self.start()
+        ready = len(self.frames)
+        if not ready:
+            return None
+        frame = self.frame(min(self.current_frame, ready - 1))
+        for _ in range(steps):
+            # Hold on the newest frame until the worker catches up, loop once complete
+            if self.current_frame < ready - 1:
+                self.current_frame += 1
+            elif self.done:
+                self.current_frame = 0
+        return frame
+
+
+class FrameEncoder:
+    # Turns composited GIF frames, or a pack's 8-bit and BGRA frames, into
+    # CompactFrames. Frames keep sharing one palette while their colours fit
+    # it, so deltas stay small; a frame that needs new colours starts a new
+    # palette and a key frame.
+    def __init__(self, palettes):
+        self.palettes = palettes
+        self.colors = None
+        self.previous = None
+
+    def encode_surface(self, frames, index):
+        surface = frames[index]
+        if surface.get_bitsize() != 8:
+            # The pack keeps frames with transparency or too many colours as BGRA
+            rgba = np.frombuffer(pygame.image.tobytes(surface, 'RGBA'), np.uint8)
+            return self.encode_rgba(rgba.reshape(surface.get_height(), surface.get_width(), 4), index)
+        width, height = surface.get_size()
+        indices = np.frombuffer(surface.get_buffer().raw, np.uint8).reshape(height, -1)[:, :width]
+        entry = ([tuple(color)[:3] for color in surface.get_palette()], (width, height), None)
+        key = index % KEY_INTERVAL == 0
+        if not self.palettes or self.palettes[-1] != entry:
+            self.palettes.append(entry)
+            self.colors = None
+            key = True
+        return self.compact(key, indices)
+
+    def compact(self, key, indices):
+        data = indices if key else indices ^ self.previous
+        self.previous = indices
+        return CompactFrame(key, len(self.palettes) - 1, zlib.compress(np.ascontiguousarray(data).tobytes(), 1))
+
+    def encode(self, img, index):
+        img.seek(index)
+        return self.encode_rgba(np.asarray(img.convert('RGBA')), index)
+
+    def encode_rgba(self, rgba, index):
+        height, width = rgba.shape[:2]
+        packed = rgba.view(np.uint32).reshape(height, width).copy()
+        packed[rgba[..., 3] == 0] = 0  # Every transparent pixel is one colour
+        indices = None
+        if self.colors is not None:
+            indices = np.minimum(np.searchsorted(self.colors, packed), len(self.colors) - 1)
+            if not np.array_equal(self.colors[indices], packed):
+                indices = None
+        key = indices is None or index % KEY_INTERVAL == 0
+        if indices is None:
+            colors, indices = np.unique(packed, return_inverse=True)
+            if len(colors) > 256:
+                # Composited frames can outgrow one palette; quantize those
+                from PIL import Image
+                quantized = Image.fromarray(rgba, 'RGBA').quantize(256, method=2).convert('RGBA')
+                packed = np.asarray(quantized).view(np.uint32).reshape(packed.shape).copy()
+                colors, indices = np.unique(packed, return_inverse=True)
+            self.colors = colors
+            self.palettes.append(palette_entry(colors, (width, height)))
+        return self.compact(key, indices.reshape(packed.shape).astype(np.uint8))
+
+
+def palette_entry(colors, size):
+    # (pygame palette, frame size, colorkey index or None) for packed RGBA colours
+    channels = colors.view(np.uint8).reshape(-1, 4)
+    transparent = np.flatnonzero(channels[:, 3] == 0)
+    palette = [tuple(color) for color in channels[:, :3].tolist()]
+    return palette, size, int(transparent[0]) if len(transparent) else None
+
+
+def close(source):
+    # A PIL image holds its file open; pack frames need nothing
+    if hasattr(source, 'close'):
+        source.close()
@@ -1,12 +1,27 @@
+import time
+STARTED = time.perf_counter()  # The startup timeline counts from here
 import pygame, sys
-from random import choice, randint
+from random import Random
 import math 
-from PIL import Image
+from asset_pack import AssetPack
+from assets import assets
+from audio import audio
+from controls import EventInput, InputRecorder, LiveInput
+from formation import AlienFormation
+from particles import ParticleSystem
+from profiler import FrameProfiler
+from projectiles import ProjectilePool
+from render import DirtyRenderer, FullRenderer, ScaledOutput
+from replay import record, save_replay
+from startup import AssetLoader, StartupTimeline, draw_loading
+from states import HOME, LOST, PLAYING, WON
+from waves import WaveSet, sprite_scale
+from timestep import FixedTimestep, SimulatedClock
  
 class Player(pygame.sprite.Sprite):
-    def __init__(self, pos, constraint, speed):
+    def __init__(self, pos, constraint, speed, input_source, time_source):
         super().__init__()
-        self.image = pygame.image.load('./graphics/spaceship.png').convert_alpha()
+        self.image = assets.image('./graphics/spaceship.png')
         self.rect = self.image.get_rect(midbottom=pos)
         self.speed = speed
         self.max_x_constraint = constraint
@@ -15,11 +30,10 @@ class Player(pygame.sprite.Sprite):
         self.laser_cooldown = 700
         self.direction = 0
         self.screen_width = constraint
+        self.input_source = input_source
+        self.time_source = time_source
 
-        self.lasers = pygame.sprite.Group()
-
-        self.laser_sound = pygame.mixer.Sound('./audio/laser.wav')
-        self.laser_sound.set_volume(0.2)
+        self.lasers = ProjectilePool(self.rect.bottom)
 
         # Variables for bobbing effect
         self.bob_height = 1  # The height of the bobbing effect
@@ -27,37 +41,18 @@ class Player(pygame.sprite.Sprite):
         self.bob_offset = 1  # Offset for the sine function
 
     def get_input(self):
-        screen_width, screen_height = pygame.display.get_surface().get_size()
-        keys = pygame.key.get_pressed()
-
-        if keys[pygame.K_RIGHT]:
-            self.rect.x += self.speed
-        elif keys[pygame.K_LEFT]:
-            self.rect.x -= self.speed
+        player_input = self.input_source.poll()
+        self.rect.x += player_input.move * self.speed
 
-        if keys[pygame.K_SPACE] and self.ready:
+        if player_input.fire and self.ready:
             self.shoot_laser()
             self.ready = False
-            self.laser_time = pygame.time.get_ticks()
-            self.laser_sound.play()
-
-        touch_input = pygame.mouse.get_pressed()
-
-        if touch_input[0]:  # Detect touch
-            touch_pos = pygame.mouse.get_pos()
-            if touch_pos[0] < screen_width / 2:
-                self.rect.x -= self.speed  # Move left
-            elif touch_pos[0] > screen_width / 2 and touch_pos[1] < screen_height * 0.8:
-                self.rect.x += self.speed  # Move right
-            elif touch_pos[1] > screen_height * 0.8:  # Bottom 20% of the screen is for shooting
-                if self.ready:
-                    self.shoot_laser()
-                    self.ready = False
-                    self.laser_time = pygame.time.get_ticks()
+            self.laser_time = self.time_source()
+            audio.play('player_laser')
 
     def recharge(self):
         if not self.ready:
-            current_time = pygame.time.get_ticks()
+            current_time = self.time_source()
             if current_time - self.laser_time >= self.laser_cooldown:
                 self.ready = True
 
@@ -68,7 +63,7 @@ class Player(pygame.sprite.Sprite):
             self.rect.right = self.max_x_constraint
 
     def shoot_laser(self):
-        self.lasers.add(Laser(self.rect.center, -8, self.rect.bottom))
+        self.lasers.spawn(self.rect.center, -8)
 
     def update(self):
         self.get_input()
@@ -80,66 +75,74 @@ class Player(pygame.sprite.Sprite):
         self.bob_offset += self.bob_speed
         self.rect.y += math.sin(self.bob_offset) * self.bob_height  # Apply bobbing
 
-class Alien(pygame.sprite.Sprite):
-	def __init__(self,color,x,y):
-		super().__init__()
-		file_path = './graphics/' + color + '.png'
-		self.image = pygame.image.load(file_path).convert_alpha()
-		self.rect = self.image.get_rect(topleft = (x,y))
-		self.bob_height = 1 
-		self.bob_speed = 0.1 
-		self.bob_offset = 0
-
-		if color == 'red': self.value = 100
-		elif color == 'green': self.value = 300
-		else: self.value = 500
-
-	def update(self,direction):
-		self.rect.x += direction
-		# Update bobbing effect
-		self.bob_offset += self.bob_speed
-		self.rect.y += math.sin(self.bob_offset) * self.bob_height  # Apply bobbing
-
 class Extra(pygame.sprite.Sprite):
-	def __init__(self,side,screen_width):
+	def __init__(self,side,screen_width,speed = 4):
 		super().__init__()
-		self.image = pygame.image.load('./graphics/extra.png').convert_alpha()
+		self.image = assets.image('./graphics/extra.png')
 		
 		if side == 'right':
 			x = screen_width + 50
-			self.speed = - 4
+			self.speed = - speed
 		else:
 			x = -50
-			self.speed = 4
+			self.speed = speed
 
 		self.rect = self.image.get_rect(topleft = (x,80))
 
 	def update(self):
 		self.rect.x += self.speed
 
-class Laser(pygame.sprite.Sprite):
-	def __init__(self,pos,speed,screen_height):
-		super().__init__()
-		self.image = pygame.Surface((4,20))
-		self.image.fill('white')
-		self.rect = self.image.get_rect(center = pos)
-		self.speed = speed
-		self.height_y_constraint = screen_height
-
-	def destroy(self):
-		if self.rect.y <= -50 or self.rect.y >= self.height_y_constraint + 50:
-			self.kill()
-
-	def update(self):
-		self.rect.y += self.speed
-		self.destroy()
-
-class Block(pygame.sprite.Sprite):
-	def __init__(self,size,color,x,y):
+class Bunker(pygame.sprite.Sprite):
+	# A whole bunker as one grid of cells drawn onto a single cached surface.
+	# Destroyed cells are punched out to the colorkey in place.
+	def __init__(self,shape,size,color,x,y):
 		super().__init__()
-		self.image = pygame.Surface((size,size))
-		self.image.fill(color)
+		self.size = size
+		self.color = color
+		self.rows = len(shape)
+		self.cols = max(len(row) for row in shape)
+		self.cells = bytearray(self.rows * self.cols)
+		self.image = pygame.Surface((self.cols * size,self.rows * size))
+		self.image.fill('black')
+		self.image.set_colorkey('black')
+		for row_index,row in enumerate(shape):
+			for col_index,col in enumerate(row):
+				if col == 'x':
+					self.cells[row_index * self.cols + col_index] = 1
+					self.image.fill(color,(col_index * size,row_index * size,size,size))
+		self.count = sum(self.cells)
 		self.rect = self.image.get_rect(topleft = (x,y))
+		# Untouched state, so a restart can patch the bunker back instead of rebuilding it
+		self.full_cells = bytes(self.cells)
+		self.full_image = self.image.copy()
+
+	def restore(self):
+		self.cells[:] = self.full_cells
+		self.count = sum(self.full_cells)
+		self.image.blit(self.full_image,(0,0))
+
+	def hit(self,rect):
+		# Clears every cell under rect, the same blocks spritecollide used to kill
+		clip = self.rect.clip(rect)
+		if not clip.width or not clip.height:
+			return False
+		size = self.size
+		left = (clip.left - self.rect.left) // size
+		right = (clip.right - 1 - self.rect.left) // size
+		top = (clip.top - self.rect.top) // size
+		bottom = (clip.bottom - 1 - self.rect.top) // size
+		cleared = False
+		for row in range(top,bottom + 1):
+			for col in range(left,right + 1):
+				index = row * self.cols + col
+				if self.cells[index]:
+					self.cells[index] = 0
+					self.image.fill('black',(col * size,row * size,size,size))
+					self.count -= 1
+					cleared = True
+		if not self.count:
+			self.kill()
+		return cleared
 
 shape = [
 '  xxxxxxx',
@@ -150,275 +153,494 @@ shape = [
 'xxx     xxx',
 'xx       xx']
 class Game:
-    def __init__(self):
-        self.home_screen_frames = []
-        self.load_home_screen_gif()
-        self.current_frame = 0
+    def __init__(self, screen_width, screen_height, renderer=None, input_source=None, time_source=None, seed=None,
+                 home_screen_budget=None):
+        # renderer=None runs the simulation headless, without drawing anything.
+        # seed fixes the whole session: every game draws its own seed from it.
+        # home_screen_budget caps the bytes the home animation keeps resident.
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.renderer = renderer
+        self.input_source = input_source or LiveInput(screen_width, screen_height)
+        # Game time only moves with simulation steps, so cooldowns and timers
+        # run at the same pace whatever the display refresh rate is
+        self.time_source = time_source or SimulatedClock()
+        self.seeds = Random(seed)
+        self.obstacle_amount = 6
+        self.extra_speed = 4
+        self.extra_value = 500
+        self.shape = shape
+        self.block_size = 6
+        self.bunker_layout = None
+        # After the last listed wave the game is won, unless endless is set
+        self.wave_set = WaveSet.load()
+        self.endless = False
+        self.alien_templates = {}
+        self.particles = ParticleSystem()
+        self.load_home_screen_gif(home_screen_budget)
+        self.load_assets()
         self.clock = pygame.time.Clock()
         self.reset_game()
-        self.game_won = False
-        self.game_over = False  # New flag to track game over state
-
-    def load_home_screen_gif(self):
-        # Load the GIF using PIL
-        gif_path = './graphics/home.gif'
-        with Image.open(gif_path) as img:
-            for frame in range(img.n_frames):
-                img.seek(frame)
-                # Convert the frame to a Pygame-compatible format
-                frame_data = img.convert("RGBA").tobytes()  # Convert to RGBA
-                frame_surface = pygame.image.frombuffer(frame_data, img.size, "RGBA")
-                self.home_screen_frames.append(frame_surface)
-
-
-    def reset_game(self):
+
+    def load_home_screen_gif(self, max_bytes=None):
+        # Frames are decoded the first time the home screen is shown
+        self.home_screen = assets.animation('./graphics/home.gif', max_bytes)
+
+    def load_assets(self):
+        # Everything here outlives restarts
+        self.live_surf = assets.image('./graphics/spaceship.png')
+        self.live_x_start_pos = self.screen_width - (self.live_surf.get_size()[0] * 2)
+        self.font = assets.font('./font/Pixeled.ttf', 20)
+        self.text = assets.text('./font/Pixeled.ttf', 20)
+
+        # Audio
+        audio.preload()
+        audio.play_music('./audio/music.wav', 0.2)
+
+    def reset_game(self, seed=None):
+        # Only the world is rebuilt here; images, fonts and sounds come from load_assets
+        # A game is reproducible from its seed and the inputs in self.recorder
+        self.seed = self.seeds.getrandbits(32) if seed is None else seed
+        self.random = Random(self.seed)
+        self.time_source.reset()
+        self.recorder = InputRecorder(self.input_source)
+        self.particles.reset(self.seed)
+        # The home screen is off until the next game over, so are its frames
+        self.home_screen.release()
+
         # Adjust screen size for mobile devices
-        player_sprite = Player((screen_width / 2, screen_height), screen_width, 5)
+        screen_width, screen_height = self.screen_width, self.screen_height
+        player_sprite = Player((screen_width / 2, screen_height), screen_width, 5, self.recorder, self.time_source)
         self.player = pygame.sprite.GroupSingle(player_sprite)
 
         # Health and score setup
         self.lives = 3
-        self.live_surf = pygame.image.load('./graphics/spaceship.png').convert_alpha()
-        self.live_x_start_pos = screen_width - (self.live_surf.get_size()[0] * 2)
         self.score = 0
-        self.font = pygame.font.Font('./font/Pixeled.ttf', 20)
 
-        # Obstacle setup
-        self.shape = shape
-        self.block_size = 6
-        self.blocks = pygame.sprite.Group()
-        self.obstacle_amount = 6
-        self.obstacle_x_positions = [num * (screen_width / self.obstacle_amount) for num in range(self.obstacle_amount)]
-        self.create_multiple_obstacles(*self.obstacle_x_positions, x_start=screen_width / 15, y_start=480)
+        # Obstacle setup: the same bunkers are restored unless the layout changed
+        layout = (self.obstacle_amount, screen_width)
+        if layout != self.bunker_layout:
+            self.bunker_layout = layout
+            self.bunkers = pygame.sprite.Group()
+            self.obstacle_x_positions = [num * (screen_width / self.obstacle_amount) for num in range(self.obstacle_amount)]
+            self.create_multiple_obstacles(*self.obstacle_x_positions, x_start=screen_width / 15, y_start=480)
+            self.all_bunkers = self.bunkers.sprites()
+            # Everything a laser or alien has to touch to reach any bunker; empty without bunkers
+            self.bunker_area = pygame.Rect(0, 0, 0, 0)
+            if self.all_bunkers:
+                self.bunker_area = self.all_bunkers[0].rect.unionall([bunker.rect for bunker in self.all_bunkers])
+        else:
+            for bunker in self.all_bunkers:
+                bunker.restore()
+            self.bunkers = pygame.sprite.Group(self.all_bunkers)
 
         # Alien setup
-        self.aliens = pygame.sprite.Group()
-        self.alien_lasers = pygame.sprite.Group()
-        self.alien_setup(rows=7, cols=11)
-        self.alien_direction = 1
+        self.alien_lasers = ProjectilePool(screen_height)
+        self.start_wave(0)
 
         # Extra alien setup
         self.extra = pygame.sprite.GroupSingle()
-        self.extra_spawn_time = randint(40, 80)
+        self.extra_spawn_time = self.random.randint(40, 80)
+        self.alien_laser_time = self.time_source()
 
-        # Game state
-        self.game_active = True
-        self.game_over = False  # Reset game over state
-        self.game_won = False  # Reset victory state
+        self.state = PLAYING
+
+    def confirm(self):
+        # SPACE or a tap: one transition per press, whatever else is queued
+        if self.state == LOST:
+            self.state = HOME
+        elif self.state in (HOME, WON):
+            self.reset_game()
 
-        # Audio
-        music = pygame.mixer.Sound('./audio/music.wav')
-        music.set_volume(0.2)
-        music.play(loops=-1)
-        self.laser_sound = pygame.mixer.Sound('./audio/laser.wav')
-        self.laser_sound.set_volume(0.5)
-        self.explosion_sound = pygame.mixer.Sound('./audio/explosion.wav')
-        self.explosion_sound.set_volume(0.3)
-
-    def display_home_screen(self):
-        if self.home_screen_frames:
-            screen.blit(self.home_screen_frames[self.current_frame], (0, 0))
-            self.current_frame += 1
-            if self.current_frame >= len(self.home_screen_frames):
-                self.current_frame = 0
-            
     def create_obstacle(self, x_start, y_start, offset_x):
-        for row_index, row in enumerate(self.shape):
-            for col_index, col in enumerate(row):
-                if col == 'x':
-                    x = x_start + col_index * self.block_size + offset_x
-                    y = y_start + row_index * self.block_size
-                    block = Block(self.block_size, (255, 153, 0), x, y)
-                    self.blocks.add(block)
+        bunker = Bunker(self.shape, self.block_size, (255, 153, 0), x_start + offset_x, y_start)
+        self.bunkers.add(bunker)
 
     def create_multiple_obstacles(self, *offset, x_start, y_start):
         for offset_x in offset:
             self.create_obstacle(x_start, y_start, offset_x)
 
-    def alien_setup(self, rows, cols, x_distance=60, y_distance=48, x_offset=70, y_offset=100):
-        for row_index in range(rows):
-            for col_index in range(cols):
-                x = col_index * x_distance + x_offset
-                y = row_index * y_distance + y_offset
-                alien_sprite = Alien('yellow' if row_index == 0 else 'green' if row_index <= 2 else 'red', x, y)
-                self.aliens.add(alien_sprite)
+    def start_wave(self, index):
+        self.wave_index = index
+        self.wave = self.wave_set.wave(index, self.endless)
+        self.aliens = AlienFormation()
+        self.alien_setup(self.wave)
+        self.alien_direction = 1
+        self.alien_laser_interval = self.wave.fire_interval
+
+    def alien_setup(self, wave):
+        # Each wave's starting layout is built once and reused by restarts
+        template = self.alien_templates.get(wave)
+        if template is None:
+            scale = sprite_scale(wave)
+            images, xs, ys, values = [], [], [], []
+            for row_index, row in enumerate(wave.layout):
+                for col_index, symbol in enumerate(row):
+                    if symbol in '. ':
+                        continue
+                    alien = self.wave_set.aliens[symbol]
+                    image = assets.image(alien.image)
+                    if scale < 1:
+                        width, height = image.get_size()
+                        image = assets.scaled(alien.image, (max(1, round(width * scale)), max(1, round(height * scale))))
+                    images.append(image)
+                    xs.append(col_index * wave.x_distance + wave.x_offset)
+                    ys.append(row_index * wave.y_distance + wave.y_offset)
+                    values.append(alien.value)
+            template = self.alien_templates[wave] = (images, xs, ys, values)
+        self.aliens.spawn(*template)
 
     def alien_position_checker(self):
-        all_aliens = self.aliens.sprites()
-        for alien in all_aliens:
-            if alien.rect.right >= screen_width:
-                self.alien_direction = -1
-                self.alien_move_down(2)
-            elif alien.rect.left <= 0:
-                self.alien_direction = 1
-                self.alien_move_down(2)
+        # The formation keeps its bounding box up to date, so this is one comparison per side
+        if not self.aliens:
+            return
+        if self.aliens.right_edge() >= self.screen_width:
+            self.alien_direction = -1
+            self.alien_move_down(self.wave.drop)
+        elif self.aliens.left_edge() <= 0:
+            self.alien_direction = 1
+            self.alien_move_down(self.wave.drop)
 
     def alien_move_down(self, distance):
-        if self.aliens:
-            for alien in self.aliens.sprites():
-                alien.rect.y += distance
+        self.aliens.move_down(distance)
 
     def alien_shoot(self):
-        if self.aliens.sprites():
-            random_alien = choice(self.aliens.sprites())
-            laser_sprite = Laser(random_alien.rect.center, 6, screen_height)
-            self.alien_lasers.add(laser_sprite)
-            self.laser_sound.play()
+        if self.aliens:
+            random_alien = self.random.choice(self.aliens.alive_indices())
+            self.alien_lasers.spawn(self.aliens.center(random_alien), self.wave.laser_speed)
+            audio.play('alien_laser')
+
+    def alien_laser_timer(self):
+        current_time = self.time_source()
+        if current_time - self.alien_laser_time >= self.alien_laser_interval:
+            self.alien_laser_time = current_time
+            self.alien_shoot()
 
     def extra_alien_timer(self):
         self.extra_spawn_time -= 1
         if self.extra_spawn_time <= 0:
-            self.extra.add(Extra(choice(['right', 'left']), screen_width))
-            self.extra_spawn_time = randint(400, 800)
+            self.extra.add(Extra(self.random.choice(['right', 'left']), self.screen_width, self.extra_speed))
+            self.extra_spawn_time = self.random.randint(400, 800)
+
+    def explode(self, center, color, count):
+        # Debris is only for show, so headless games skip it
+        if self.renderer is not None:
+            self.particles.burst(center, color, count)
+
+    def bunker_hits(self, lasers):
+        # Bunkers never overlap, so each one only sees the lasers inside it.
+        # Most steps no laser is anywhere near the bunker row at all.
+        if not self.all_bunkers:
+            return
+        nearby = lasers.candidates(self.bunker_area)
+        if not nearby:
+            return
+        rects = [lasers.rect(index) for index in nearby]
+        for bunker in self.bunkers.sprites():
+            for index in bunker.rect.collidelistall(rects):
+                index, rect = nearby[index], rects[index]
+                if lasers.alive[index] and bunker.hit(rect):
+                    lasers.kill(index)
+                    self.explode(bunker.rect.clip(rect).center, bunker.color, 4)
 
     def collision_checks(self):
-        if self.player.sprite.lasers:
-            for laser in self.player.sprite.lasers:
-                if pygame.sprite.spritecollide(laser, self.blocks, True):
-                    laser.kill()
-                aliens_hit = pygame.sprite.spritecollide(laser, self.aliens, True)
-                if aliens_hit:
-                    for alien in aliens_hit:
-                        self.score += alien.value
-                    laser.kill()
-                    self.explosion_sound.play()
-                if pygame.sprite.spritecollide(laser, self.extra, True):
-                    self.score += 500
-                    laser.kill()
-
-        if self.alien_lasers:
-            for laser in self.alien_lasers:
-                if pygame.sprite.spritecollide(laser, self.blocks, True):
-                    laser.kill()
-                if pygame.sprite.spritecollide(laser, self.player, False):
-                    laser.kill()
-                    self.lives -= 1
-                    if self.lives <= 0:
-                        self.game_active = False
+        # Every laser still meets every target, but one target at a time: the
+        # pool hands over only the lasers touching it, oldest first
+        lasers = self.player.sprite.lasers
+        if lasers:
+            self.bunker_hits(lasers)
+            if self.aliens:
+                for index in lasers.candidates(self.aliens.bounds()):
+                    aliens_hit = self.aliens.hit(lasers.rect(index))
+                    if aliens_hit:
+                        for alien in aliens_hit:
+                            self.score += int(self.aliens.value[alien])
+                            image = self.aliens.images[self.aliens.kind[alien]]
+                            self.explode(self.aliens.center(alien), self.particles.image_color(image), 12)
+                        lasers.kill(index)
+                        audio.play('explosion')
+            if self.extra:
+                for index in lasers.candidates(self.extra.sprite.rect):
+                    extra = self.extra.sprite
+                    self.explode(extra.rect.center, self.particles.image_color(extra.image), 32)
+                    extra.kill()
+                    self.score += self.extra_value
+                    lasers.kill(index)
+                    break
+
+        lasers = self.alien_lasers
+        if lasers:
+            self.bunker_hits(lasers)
+            for index in lasers.candidates(self.player.sprite.rect):
+                lasers.kill(index)
+                self.lives -= 1
+                if self.lives <= 0:
+                    self.state = LOST
 
         if self.aliens:
-            for alien in self.aliens:
-                pygame.sprite.spritecollide(alien, self.blocks, True)
-                if pygame.sprite.spritecollide(alien, self.player, False):
-                    self.game_active = False
+            # Only aliens filed in the grid cells around a bunker can reach it,
+            # and none can until the formation is down at the bunker row
+            bounds = self.aliens.bounds()
+            if bounds.colliderect(self.bunker_area):
+                for bunker in self.bunkers.sprites():
+                    for alien in self.aliens.collide(bunker.rect):
+                        bunker.hit(self.aliens.rect(alien))
+            if bounds.colliderect(self.player.sprite.rect) and self.aliens.collide(self.player.sprite.rect):
+                self.state = LOST
 
     def display_lives(self):
         for live in range(self.lives - 1):
             x = self.live_x_start_pos + (live * (self.live_surf.get_size()[0] + 10))
-            screen.blit(self.live_surf, (x, 8))
+            self.renderer.blit(self.live_surf, (x, 8))
 
     def display_score(self):
-        score_surf = self.font.render(f'score: {self.score}', False, 'white')
+        score_surf = self.text.render(f'score: {self.score}')
         score_rect = score_surf.get_rect(topleft=(10, -10))
-        screen.blit(score_surf, score_rect)
-
-    def display_home_screen(self):
-        if self.home_screen_frames:
-            screen.blit(self.home_screen_frames[self.current_frame], (0, 0))
-            self.current_frame += 1
-            if self.current_frame >= len(self.home_screen_frames):
-                self.current_frame = 0
+        self.renderer.blit(score_surf, score_rect)
+
+    def display_home_screen(self, steps=1):
+        # Headless games never show it, so never decode it either
+        if self.renderer is None:
+            return
+        frame = self.home_screen.next_frame(steps)
+        if frame is not None:
+            self.renderer.blit(frame, (0, 0), self.home_screen.version)
+
+    def victory_check(self):
+        if not self.aliens and self.state == PLAYING:
+            if self.wave_set.wave(self.wave_index + 1, self.endless) is not None:
+                self.start_wave(self.wave_index + 1)
+            else:
+                self.state = WON
 
     def victory_message(self):
-        if not self.aliens.sprites():
-            victory_surf = self.font.render('You have won a special prize.', False, 'white')
-            victory_rect = victory_surf.get_rect(center=(screen_width / 2, screen_height / 2))
-            screen.blit(victory_surf, victory_rect)
-            self.game_won = True  # Set the game won flag
+        if self.state == WON:
+            victory_surf = self.text.render('You have won a special prize.')
+            victory_rect = victory_surf.get_rect(center=(self.screen_width / 2, self.screen_height / 2))
+            self.renderer.blit(victory_surf, victory_rect)
 
     def game_over_screen(self):
-        score_surf = self.font.render(f'score: {self.score}', False, 'white')
+        screen_width, screen_height = self.screen_width, self.screen_height
+        score_surf = self.text.render(f'score: {self.score}')
         score_rect = score_surf.get_rect(topleft=(10, -10))
-        screen.blit(score_surf, score_rect)
+        self.renderer.blit(score_surf, score_rect)
 
-        game_over_surf = self.font.render('Game Over. But you still get a special prize!', False, 'white')
+        game_over_surf = self.text.render('Game Over. But you still get a special prize!')
         game_over_rect = game_over_surf.get_rect(center=(screen_width / 2, screen_height / 2))
-        screen.blit(game_over_surf, game_over_rect)
+        self.renderer.blit(game_over_surf, game_over_rect)
 
-        restart_surf = self.font.render('TAP or SPACE to return to Home', False, 'white')
+        restart_surf = self.text.render('TAP or SPACE to return to Home')
         restart_rect = restart_surf.get_rect(center=(screen_width / 2, screen_height / 2 + 50))
-        screen.blit(restart_surf, restart_rect)
-
-    def run(self):
-        if self.game_active:
-            # Normal game running logic...
-            self.player.update()
-            self.alien_lasers.update()
-            self.extra.update()
-            self.aliens.update(self.alien_direction)
-            self.alien_position_checker()
-            self.extra_alien_timer()
-            self.collision_checks()
-
-            self.player.sprite.lasers.draw(screen)
-            self.player.draw(screen)
-            self.blocks.draw(screen)
-            self.aliens.draw(screen)
-            self.alien_lasers.draw(screen)
-            self.extra.draw(screen)
-            self.display_lives()
-            self.display_score()
-            self.victory_message()
-            if not self.game_active and not self.game_won:
-                self.game_over_screen()  # Show game over screen
-        else:
-            self.display_home_screen()
+        self.renderer.blit(restart_surf, restart_rect)
+
+    def update_sprites(self):
+        self.player.update()
+        self.alien_lasers.update()
+        self.extra.update()
+        self.aliens.update(self.alien_direction * self.wave.speed)
+        self.particles.update()
+
+    def save_positions(self):
+        # Where everything was before this step, so draw() can blend towards the new state
+        for group in (self.player, self.extra):
+            for sprite in group:
+                sprite.previous = sprite.rect.topleft
+        self.player.sprite.lasers.save_position()
+        self.alien_lasers.save_position()
+        self.aliens.save_position()
+        self.particles.save_position()
+
+    def step(self):
+        self.save_positions()
+        self.update()
+        self.time_source.advance()
+
+    def update(self):
+        self.update_sprites()
+        self.alien_position_checker()
+        self.alien_laser_timer()
+        self.extra_alien_timer()
+        self.collision_checks()
+        self.victory_check()
+
+    @staticmethod
+    def interpolate(sprite, alpha):
+        # Sprites created during the last step have nothing to blend from
+        previous = getattr(sprite, 'previous', None)
+        if previous is None or alpha >= 1:
+            return sprite.rect
+        x, y = previous
+        return (math.floor(x + (sprite.rect.x - x) * alpha + 0.5),
+                math.floor(y + (sprite.rect.y - y) * alpha + 0.5))
+
+    def draw_group(self, group, alpha=1.0):
+        self.renderer.blits([(sprite.image, self.interpolate(sprite, alpha)) for sprite in group])
+
+    def draw(self, alpha=1.0):
+        self.player.sprite.lasers.draw(self.renderer, alpha)
+        self.draw_group(self.player, alpha)
+        for bunker in self.bunkers:
+            # Bunker surfaces are edited in place, their cell count marks the change
+            self.renderer.blit(bunker.image, bunker.rect, bunker.count)
+        self.aliens.draw(self.renderer, alpha)
+        self.alien_lasers.draw(self.renderer, alpha)
+        self.draw_group(self.extra, alpha)
+        self.particles.draw(self.renderer, alpha)
+        self.display_lives()
+        self.display_score()
+        self.victory_message()
+        if self.state == LOST:
+            self.game_over_screen()  # Show game over screen
+
+    def run(self, steps=1, alpha=1.0):
+        # Advances the simulation by whole steps, then draws alpha of the way
+        # into the next one. Only PLAYING moves: a won or lost game stays
+        # frozen under its message until confirm() moves it on.
+        if self.state == HOME:
+            self.display_home_screen(steps)
+            return
+        for _ in range(steps):
+            if self.state != PLAYING:
+                break
+            self.step()
+        if self.renderer is not None:
+            self.draw(alpha if self.state == PLAYING else 1.0)
 
 if __name__ == '__main__':
+    # --startup-report prints where the time went up to the first game frame
+    timeline = StartupTimeline(STARTED)
+    timeline.mark('imports')
     pygame.init()
 
+    # The game always runs at this logical resolution, whatever the device's
+    # own is; --window WxH opens a window of that size instead of fullscreen
     screen_info = pygame.display.Info()
     screen_width = 1280
     screen_height = 720
-    screen = pygame.display.set_mode((screen_width, screen_height), pygame.FULLSCREEN)
+    if '--window' in sys.argv:
+        window_size = tuple(int(n) for n in sys.argv[sys.argv.index('--window') + 1].split('x'))
+        display = pygame.display.set_mode(window_size)
+    else:
+        display = pygame.display.set_mode((screen_info.current_w, screen_info.current_h), pygame.FULLSCREEN)
+    if display.get_size() == (screen_width, screen_height):
+        screen, output = display, None  # Nothing to scale, draw straight to the display
+    else:
+        output = ScaledOutput(display, (screen_width, screen_height))
+        screen = pygame.Surface((screen_width, screen_height)).convert()
+    timeline.mark('display')
+
+    # A loading bar goes up straight away; the assets are decoded behind it
+    # on a background thread while this one keeps the window responsive
+    draw_loading(display, 0)
+    pygame.display.flip()
+    timeline.mark('first frame')
+
+    def attach_pack():
+        # A prebaked pack (code/build_assets.py) skips PNG/GIF decoding and rescaling
+        pack = AssetPack.open_default()
+        if pack is not None:
+            assets.attach_pack(pack)
+
+    def load_sprites():
+        paths = ['./graphics/spaceship.png', './graphics/extra.png']
+        return [assets.image(path) for path in paths + [alien.image for alien in WaveSet.load().aliens.values()]]
+
+    loader = AssetLoader([
+        ('asset pack', attach_pack),
+        ('background', lambda: assets.scaled('./graphics/background.png', (screen_width, screen_height), alpha=False)),
+        ('sprites', load_sprites),
+        ('fonts', lambda: assets.text('./font/Pixeled.ttf', 20)),
+        ('sounds', audio.preload),
+    ], timeline).start()
+    loading_clock = pygame.time.Clock()
+    while not loader.done:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+        draw_loading(display, loader.progress)
+        pygame.display.flip()
+        loading_clock.tick(60)
+    timeline.mark('loading screen')
+    background = loader.result('background')
 
-    background = pygame.image.load('./graphics/background.png').convert()
-    background = pygame.transform.scale(background, (screen_width, screen_height))
-    
     # Create a semi-transparent black surface
     overlay = pygame.Surface((screen_width, screen_height))
     overlay.fill((0, 0, 0))  # Fill it with black
     overlay.set_alpha(25)  # Set the alpha value (10% opacity)
 
+    # --dirty-rects only repaints and pushes the regions that changed each frame
+    if '--dirty-rects' in sys.argv:
+        renderer = DirtyRenderer(screen, background, output)
+    else:
+        renderer = FullRenderer(screen, background, output)
+
+    # --fps N sets the display refresh; the simulation always steps at 60 Hz
+    fps = int(sys.argv[sys.argv.index('--fps') + 1]) if '--fps' in sys.argv else 60
+    timestep = FixedTimestep()
+
+    # --seed N makes the session reproducible, --record PATH saves each game
+    # as it ends (or on quit) for code/replay.py
+    seed = int(sys.argv[sys.argv.index('--seed') + 1]) if '--seed' in sys.argv else None
+    record_path = sys.argv[sys.argv.index('--record') + 1] if '--record' in sys.argv else None
+
     clock = pygame.time.Clock()
-    game = Game()
-    
-    ALIENLASER = pygame.USEREVENT + 1
-    pygame.time.set_timer(ALIENLASER, 700)
+    # Input comes from the event queue; --latency prints how long presses
+    # took to reach the screen when the game quits
+    input_source = EventInput(screen_width, screen_height, output.to_logical if output else None)
+    game = Game(screen_width, screen_height, renderer, input_source, seed=seed)
+    game.clock.tick()  # Loading time is not simulation time
+    timeline.mark('game')
+    startup_report = '--startup-report' in sys.argv
+    # --endless keeps generating waves after the ones in data/waves.json
+    game.endless = '--endless' in sys.argv
+
+    # F3 toggles the phase timing overlay (--profile starts with it on), F4
+    # writes the recorded frames to a CSV file
+    profiler = FrameProfiler()
+    if '--profile' in sys.argv:
+        profiler.attach(game)
 
     while True:
+        steps = timestep.advance(game.clock.tick(fps))
+        renderer.begin()
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                if record_path and game.state == PLAYING:
+                    save_replay(record_path, record(game))
+                if '--latency' in sys.argv and input_source.latency:
+                    latency = input_source.latency.stats()
+                    print(f"input latency over {latency['count']} presses: mean {latency['mean']:.1f} ms,"
+                          f" p50 {latency['p50']:.1f} ms, p95 {latency['p95']:.1f} ms, max {latency['max']:.1f} ms")
                 pygame.quit()
                 sys.exit()
-            if event.type == ALIENLASER and game.game_active:
-                game.alien_shoot()
-            # Handle home screen actions
-            if not game.game_active:
-                game.display_home_screen()
-                if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
-                    game.reset_game()  # Restart the game when space is pressed
-                if event.type == pygame.MOUSEBUTTONDOWN:  # On tap (mouse click)
-                    game.reset_game()  # Restart the game
-
-            # Check for game won condition
-            if game.game_won:
-                game.display_home_screen()
-                if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
-                    game.reset_game()  # Reset the game when space is pressed
-                    game.game_won = False  # Reset the victory flag
-            
-            # Check for game over condition
-            if not game.game_active and event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
-                game.reset_game()  # Reset the game if game over and space is pressed
-            if not game.game_active and event.type == pygame.MOUSEBUTTONDOWN:  # On tap (mouse click)
-                game.reset_game()  # Reset the game if game over and mouse is clicked
-
-        screen.blit(background, (0, 0))
-        if game.game_active:
-            game.run()
-        else:
-            game.display_home_screen()  # Show home screen when game is not active
-
-        pygame.display.flip()
-        game.clock.tick(60)
\ No newline at end of file
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                profiler.toggle(game)
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F4 and profiler.frames:
+                print('profile written to', profiler.dump(time.strftime('profile-%Y%m%d-%H%M%S.csv')))
+            # The display may have lost what was on it while the window was
+            # covered or the app was in the background: push everything again
+            if event.type in (pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED, pygame.APP_DIDENTERFOREGROUND):
+                renderer.invalidate()
+            # SPACE or a tap moves home, won and lost screens on by one state
+            if (event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE) or event.type == pygame.MOUSEBUTTONDOWN:
+                game.confirm()
+            input_source.handle(event)
+
+        state = game.state
+        if state != PLAYING:
+            input_source.clear()
+        game.run(steps, timestep.alpha)
+        if record_path and state == PLAYING and game.state != PLAYING:
+            save_replay(record_path, record(game))  # The game was just won or lost
+
+        if profiler.attached:
+            profiler.draw(renderer)
+        renderer.present()
+        input_source.presented()
+        if startup_report:
+            timeline.mark('first game frame')
+            print(timeline.report())
+            startup_report = False
+        if profiler.attached:
+            profiler.end_frame()
\ No newline at end of file
@@ -0,0 +1,121 @@
+import math
+
+import numpy as np
+import pygame
+
+# Shades a particle darkens through over its life, brightest first
+FADE_LEVELS = 4
+
+
+class ParticleSystem:
+    # Explosion debris as slots in fixed arrays. The capacity is a hard
+    # budget: once it is full a new burst overwrites the oldest particles
+    # instead of growing, so no chain of explosions can cost more than
+    # `capacity` particles to update and draw. Everything moves in one bulk
+    # update per step and is drawn with a single blits call.
+    def __init__(self, capacity=1024, size=3, gravity=0.15, seed=None):
+        self.capacity = capacity
+        self.size = size
+        self.gravity = gravity
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.previous_x = np.zeros(capacity)
+        self.previous_y = np.zeros(capacity)
+        self.dx = np.zeros(capacity)
+        self.dy = np.zeros(capacity)
+        self.age = np.zeros(capacity, np.int64)
+        self.lifetime = np.ones(capacity, np.int64)
+        self.kind = np.zeros(capacity, np.int64)
+        self.alive = np.zeros(capacity, bool)
+        # Next slot to write; it wraps, so the oldest particles go first
+        self.cursor = 0
+        self.count = 0
+        # One run of FADE_LEVELS images per color, kind * FADE_LEVELS + shade
+        self.kinds = {}
+        self.images = np.empty(0, object)
+        self.colors = {}
+        self.random = np.random.default_rng(seed)
+
+    def __len__(self):
+        return self.count
+
+    def reset(self, seed=None):
+        self.alive[:] = False
+        self.count = 0
+        self.cursor = 0
+        self.random = np.random.default_rng(seed)
+
+    def color_kind(self, color):
+        color = pygame.Color(color)
+        key = tuple(color)
+        kind = self.kinds.get(key)
+        if kind is None:
+            kind = self.kinds[key] = len(self.kinds)
+            shades = []
+            for level in range(FADE_LEVELS):
+                image = pygame.Surface((self.size, self.size))
+                image.fill(color.lerp('black', level / FADE_LEVELS))
+                shades.append(image)
+            images = np.empty(len(shades), object)
+            images[:] = shades
+            self.images = np.concatenate([self.images, images])
+        return kind
+
+    def image_color(self, image):
+        # The average color of a sprite, so debris matches what was hit
+        color = self.colors.get(id(image))
+        if color is None:
+            color = self.colors[id(image)] = pygame.transform.average_color(image, image.get_bounding_rect())
+        return color
+
+    def burst(self, center, color, count=12, speed=3.0, lifetime=30):
+        count = min(count, self.capacity)
+        slots = (self.cursor + np.arange(count)) % self.capacity
+        self.cursor = (self.cursor + count) % self.capacity
+        self.count += count - int(self.alive[slots].sum())
+
+        random = self.random
+        angle = random.uniform(0, 2 * math.pi, count)
+        velocity = random.uniform(0.3, 1.0, count) * speed
+        self.x[slots] = self.previous_x[slots] = center[0]
+        self.y[slots] = self.previous_y[slots] = center[1]
+        self.dx[slots] = np.cos(angle) * velocity
+        self.dy[slots] = np.sin(angle) * velocity
+        self.age[slots] = 0
+        self.lifetime[slots] = random.integers(lifetime // 2, lifetime + 1, count)
+        self.kind[slots] = self.color_kind(color)
+        self.alive[slots] = True
+
+    def save_position(self):
+        if self.count:
+            np.copyto(self.previous_x, self.x)
+            np.copyto(self.previous_y, self.y)
+
+    def update(self):
+        if not self.count:
+            return
+        alive = self.alive
+        self.x[alive] += self.dx[alive]
+        self.y[alive] += self.dy[alive]
+        self.dy[alive] += self.gravity
+        self.age[alive] += 1
+        gone = alive & (self.age >= self.lifetime)
+        if gone.any():
+            alive[gone] = False
+            self.count = int(alive.sum())
+
+    def draw(self, renderer, alpha=1.0):
+        if not self.count:
+            return
+        alive = np.flatnonzero(self.alive)
+        x, y = self.x[alive], self.y[alive]
+        if alpha < 1:
+            previous_x, previous_y = self.previous_x[alive], self.previous_y[alive]
+            x = previous_x + (x - previous_x) * alpha
+            y = previous_y + (y - previous_y) * alpha
+        half = self.size / 2
+        x = np.floor(x - half + 0.5).astype(np.int64)
+        y = np.floor(y - half + 0.5).astype(np.int64)
+        shade = self.age[alive] * FADE_LEVELS // self.lifetime[alive]
+        images = self.images[self.kind[alive] * FADE_LEVELS + np.minimum(shade, FADE_LEVELS - 1)]
+        renderer.blits(list(zip(images.tolist(), zip(x.tolist(), y.tolist()))))
@@ -0,0 +1,136 @@
+import csv
+import time
+
+import numpy as np
+import pygame
+
+from assets import assets
+
+PHASES = ['update_sprites', 'alien_position_checker', 'alien_laser_timer', 'extra_alien_timer',
+          'collision_checks', 'victory_check', 'draw', 'display_home_screen']
+
+
+class FrameProfiler:
+    # Times the game's phases into a ring buffer holding the last `capacity`
+    # frames. Attaching wraps the phase methods on the game and renderer
+    # instances; detached, the plain class methods run again and profiling
+    # costs nothing.
+    def __init__(self, capacity=600, phases=PHASES):
+        self.phases = list(phases)
+        # Renderer present (the flip) and the whole frame, sleep included
+        self.columns = self.phases + ['present', 'frame']
+        self.buffer = np.zeros((capacity, len(self.columns)))
+        self.current = np.zeros(len(self.columns))
+        self.index = 0
+        self.frames = 0
+        self.game = None
+        self.frame_start = None
+        self.overlay = None
+        self.overlay_age = 0
+
+    @property
+    def attached(self):
+        return self.game is not None
+
+    def wrap(self, column, method):
+        current = self.current
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                current[column] += time.perf_counter() - start
+        return timed
+
+    def attach(self, game):
+        self.game = game
+        for column, name in enumerate(self.phases):
+            setattr(game, name, self.wrap(column, getattr(game, name)))
+        if game.renderer is not None:
+            game.renderer.present = self.wrap(len(self.phases), game.renderer.present)
+        self.frame_start = time.perf_counter()
+
+    def detach(self):
+        for name in self.phases:
+            self.game.__dict__.pop(name, None)
+        if self.game.renderer is not None:
+            self.game.renderer.__dict__.pop('present', None)
+        self.game = None
+        self.overlay = None
+
+    def toggle(self, game):
+        if self.attached:
+            self.detach()
+        else:
+            self.attach(game)
+
+    def end_frame(self):
+        now = time.perf_counter()
+        self.current[-1] = now - self.frame_start
+        self.frame_start = now
+        self.buffer[self.index] = self.current
+        self.current[:] = 0.0
+        self.index = (self.index + 1) % len(self.buffer)
+        self.frames += 1
+
+    def samples(self):
+        # Recorded rows in seconds, oldest first
+        if self.frames < len(self.buffer):
+            return self.buffer[:self.frames]
+        return np.roll(self.buffer, -self.index, axis=0)
+
+    def column(self, name):
+        return self.samples()[:, self.columns.index(name)]
+
+    def stats(self):
+        # Per column: last, mean, p50, p95, p99 and max, in milliseconds
+        samples = self.samples() * 1000
+        if not len(samples):
+            return {}
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99], axis=0)
+        return {name: {'last': samples[-1, column], 'mean': samples[:, column].mean(),
+                       'p50': p50[column], 'p95': p95[column], 'p99': p99[column],
+                       'max': samples[:, column].max()}
+                for column, name in enumerate(self.columns)}
+
+    def dump(self, path):
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['frame'] + [f'{name}_ms' for name in self.columns])
+            first = self.frames - len(self.samples())
+            for offset, row in enumerate(self.samples()):
+                writer.writerow([first + offset] + [f'{value * 1000:.4f}' for value in row])
+        return path
+
+    def draw(self, renderer, refresh=30):
+        # The panel is only re-rendered every `refresh` frames, so the overlay
+        # costs one blit per frame and does not read back its own timings
+        self.overlay_age += 1
+        if self.overlay is None or self.overlay_age >= refresh:
+            self.overlay = self.render_overlay(renderer)
+            self.overlay_age = 0
+        renderer.blit(self.overlay, (10, 60))
+
+    def render_overlay(self, renderer):
+        # Loaded once and shared, so a refresh never goes back to disk mid-frame
+        font = assets.font(None, 20)
+        headings = ['phase', 'last', 'mean', 'p50', 'p95', 'p99']
+        stats = self.stats()
+        if renderer.pixel_history:
+            # What the renderer pushed to the display, the fill rate the dirty rects cut
+            stats['pushed kpx'] = renderer.pixel_stats()
+        rows = [headings] + [[name] + [f"{values[key]:.2f}" for key in headings[1:]]
+                             for name, values in stats.items()]
+        widths = [180, 60, 60, 60, 60, 60]
+        line_height = font.get_linesize()
+        panel = pygame.Surface((sum(widths) + 20, line_height * len(rows) + 20), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 170))
+        for row_index, row in enumerate(rows):
+            x = 10
+            for cell, width in zip(row, widths):
+                text = font.render(cell, True, 'white')
+                # Names are left aligned, timings right aligned
+                panel.blit(text, (x if x == 10 else x + width - text.get_width(), 10 + row_index * line_height))
+                x += width
+        return panel
@@ -0,0 +1,115 @@
+import functools
+
+import numpy as np
+import pygame
+
+
+@functools.lru_cache(maxsize=None)
+def laser_image(width=4, height=20, color='white'):
+    # One surface shared by every laser on screen
+    image = pygame.Surface((width, height))
+    image.fill(color)
+    return image
+
+
+class ProjectilePool:
+    # Every live laser of one side as slots in preallocated arrays. Dead slots
+    # go on a free list and are reused, so firing allocates nothing until the
+    # pool has to grow. Lasers are culled once they are 50px past the top or
+    # the bottom limit, like the old Laser sprites.
+    def __init__(self, bottom_limit, capacity=256, image=None):
+        self.image = image or laser_image()
+        self.width, self.height = self.image.get_size()
+        self.bottom_limit = bottom_limit
+        self.x = np.zeros(capacity, np.int64)
+        self.y = np.zeros(capacity, np.int64)
+        self.previous_y = np.zeros(capacity, np.int64)
+        self.speed = np.zeros(capacity, np.int64)
+        # Spawn serial per slot, so hits resolve oldest laser first
+        self.serial = np.zeros(capacity, np.int64)
+        self.alive = np.zeros(capacity, bool)
+        self.free = list(range(capacity - 1, -1, -1))
+        self.spawned = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def grow(self):
+        capacity = len(self.alive)
+        for name in ('x', 'y', 'previous_y', 'speed', 'serial', 'alive'):
+            array = getattr(self, name)
+            setattr(self, name, np.concatenate([array, np.zeros_like(array)]))
+        self.free.extend(range(2 * capacity - 1, capacity - 1, -1))
+
+    def spawn(self, center, speed):
+        if not self.free:
+            self.grow()
+        index = self.free.pop()
+        # Same placement as get_rect(center=...)
+        self.x[index] = center[0] - self.width // 2
+        self.y[index] = self.previous_y[index] = center[1] - self.height // 2
+        self.speed[index] = speed
+        self.serial[index] = self.spawned
+        self.alive[index] = True
+        self.spawned += 1
+        self.count += 1
+        return index
+
+    def kill(self, index):
+        if self.alive[index]:
+            self.alive[index] = False
+            self.free.append(index)
+            self.count -= 1
+
+    def clear(self):
+        self.free.extend(np.flatnonzero(self.alive).tolist())
+        self.alive[:] = False
+        self.count = 0
+
+    def save_position(self):
+        if self.count:
+            np.copyto(self.previous_y, self.y)
+
+    def update(self):
+        if not self.count:
+            return
+        alive = self.alive
+        self.y[alive] += self.speed[alive]
+        y = self.y
+        gone = np.flatnonzero(alive & ((y <= -50) | (y >= self.bottom_limit + 50)))
+        if len(gone):
+            alive[gone] = False
+            self.free.extend(gone.tolist())
+            self.count -= len(gone)
+
+    def rect(self, index):
+        return pygame.Rect(int(self.x[index]), int(self.y[index]), self.width, self.height)
+
+    def overlapping(self, rect):
+        # Mask of the live lasers that touch rect
+        x, y = self.x, self.y
+        return (self.alive & (x < rect.right) & (x + self.width > rect.left)
+                & (y < rect.bottom) & (y + self.height > rect.top))
+
+    def candidates(self, rect):
+        # Live lasers touching rect, oldest first
+        if not self.count:
+            return []
+        indices = np.flatnonzero(self.overlapping(rect))
+        if len(indices) > 1:
+            indices = indices[np.argsort(self.serial[indices])]
+        return indices.tolist()
+
+    def positions(self, alpha=1.0):
+        alive = np.flatnonzero(self.alive)
+        y = self.y[alive]
+        if alpha < 1:
+            previous_y = self.previous_y[alive]
+            y = np.floor(previous_y + (y - previous_y) * alpha + 0.5).astype(np.int64)
+        return zip(self.x[alive].tolist(), y.tolist())
+
+    def draw(self, renderer, alpha=1.0):
+        if self.count:
+            image = self.image
+            renderer.blits([(image, position) for position in self.positions(alpha)])
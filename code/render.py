@@ -0,0 +1,184 @@
+import numpy as np
+import pygame
+
+
+class ScaledOutput:
+    # Shows a fixed logical resolution on a display of any size. The logical
+    # frame is scaled once, keeping its aspect ratio, into a centred viewport;
+    # the bars around it are black.
+    def __init__(self, display, logical_size):
+        self.display = display
+        self.logical_size = logical_size
+        width, height = logical_size
+        scale = min(display.get_width() / width, display.get_height() / height)
+        self.viewport = pygame.Rect(0, 0, round(width * scale), round(height * scale))
+        self.viewport.center = display.get_rect().center
+        self.target = display.subsurface(self.viewport)
+        display.fill('black')
+
+    def to_logical(self, pos):
+        # Display coordinates (a mouse or touch position) to logical ones
+        width, height = self.logical_size
+        return ((pos[0] - self.viewport.x) * width / self.viewport.width,
+                (pos[1] - self.viewport.y) * height / self.viewport.height)
+
+    def to_display(self, rect):
+        # Smallest display rect covering a logical rect
+        width, height = self.logical_size
+        scale_x, scale_y = self.viewport.width / width, self.viewport.height / height
+        left = int(rect.left * scale_x) + self.viewport.x
+        top = int(rect.top * scale_y) + self.viewport.y
+        right = -int(-rect.right * scale_x) + self.viewport.x
+        bottom = -int(-rect.bottom * scale_y) + self.viewport.y
+        return pygame.Rect(left, top, right - left, bottom - top)
+
+    def pushed_pixels(self, rects=None):
+        # Display pixels present() writes for these logical rects, or for the whole frame
+        if rects is None:
+            return self.viewport.width * self.viewport.height
+        return sum(rect.width * rect.height for rect in map(self.to_display, rects))
+
+    def present(self, surface, rects=None):
+        pygame.transform.scale(surface, self.viewport.size, self.target)
+        if rects is None:
+            pygame.display.flip()
+        elif rects:
+            pygame.display.update([self.to_display(rect) for rect in rects])
+
+
+class FullRenderer:
+    # Repaints the background and every sprite, then pushes the whole frame.
+    # With an output, surface is an off-screen logical frame that the output
+    # scales onto the display. Draws are only collected during the frame and
+    # go to the surface as one blits call in present, in the order they came.
+    def __init__(self, surface, background=None, output=None):
+        self.surface = surface
+        self.background = background
+        self.output = output
+        self.screen_rect = surface.get_rect()
+        self.batch = []
+        # Pixels pushed to the display by the last frame, and a short history of it
+        self.pixels = 0
+        self.pixel_history = []
+
+    def invalidate(self):
+        pass
+
+    def begin(self):
+        self.batch = [(self.background, (0, 0))] if self.background is not None else []
+
+    def blit(self, image, pos, version=None):
+        self.batch.append((image, pos))
+
+    def blits(self, sequence):
+        self.batch.extend(sequence)
+
+    def present(self):
+        if self.background is None:
+            self.surface.fill('black')
+        self.surface.blits(self.batch, False)
+        self.batch = []
+        if self.output is not None:
+            self.output.present(self.surface)
+            self.record_pixels(self.output.pushed_pixels())
+        else:
+            if self.surface is pygame.display.get_surface():
+                pygame.display.flip()
+            self.record_pixels(self.screen_rect.width * self.screen_rect.height)
+
+    def record_pixels(self, pixels):
+        self.pixels = pixels
+        self.pixel_history.append(pixels)
+        del self.pixel_history[:-120]
+
+    def pixel_stats(self):
+        # Thousands of pixels pushed per frame over the history, as the profiler reports timings
+        history = np.array(self.pixel_history) / 1000
+        p50, p95, p99 = np.percentile(history, [50, 95, 99])
+        return {'last': history[-1], 'mean': history.mean(), 'p50': p50, 'p95': p95, 'p99': p99,
+                'max': history.max()}
+
+
+class DirtyRenderer(FullRenderer):
+    # Collects the frame's draws and only repaints, and pushes to the display,
+    # the regions where something appeared, disappeared, moved or changed.
+    # A draw is unchanged when the same image lands on the same rect with the
+    # same version; pass a version for images that are edited in place.
+    def __init__(self, surface, background=None, output=None):
+        super().__init__(surface, background, output)
+        self.draws = []
+        self.previous = {}
+        self.previous_images = []
+        self.full_repaint = True
+        self.max_rects = 256
+
+    def invalidate(self):
+        self.full_repaint = True
+
+    def begin(self):
+        self.draws = []
+
+    def blit(self, image, pos, version=None):
+        self.draws.append((image, pygame.Rect(pos[0], pos[1], *image.get_size()), version))
+
+    def blits(self, sequence):
+        self.draws.extend((image, pygame.Rect(pos[0], pos[1], *image.get_size()), None) for image, pos in sequence)
+
+    def dirty_rects(self, current):
+        if self.full_repaint:
+            self.full_repaint = False
+            return [self.screen_rect.copy()]
+        previous = self.previous
+        rects = [rect for key, rect in previous.items() if key not in current]
+        rects += [rect for key, rect in current.items() if key not in previous]
+        if len(rects) > self.max_rects:
+            # Merging is quadratic; past this many changes one full repaint is cheaper
+            return [self.screen_rect.copy()]
+        # Merge overlapping rects so no pixel is repainted twice
+        merged = []
+        for rect in rects:
+            rect = rect.clip(self.screen_rect)
+            if not rect.width or not rect.height:
+                continue
+            index = rect.collidelist(merged)
+            while index != -1:
+                rect.union_ip(merged.pop(index))
+                index = rect.collidelist(merged)
+            merged.append(rect)
+        return merged
+
+    def present(self):
+        # Keyed by image identity; keeping the previous frame's images alive in
+        # self.previous means a new surface can never reuse one of their ids
+        current = {(id(image), rect.x, rect.y, rect.width, rect.height, version): rect
+                   for image, rect, version in self.draws}
+        # A full repaint also pushes the whole display, the bars around a scaled frame included
+        repaint_all = self.full_repaint
+        dirty = self.dirty_rects(current)
+        surface = self.surface
+        draw_rects = [rect for _, rect, _ in self.draws]
+        for area in dirty:
+            surface.set_clip(area)
+            if self.background is not None:
+                surface.blit(self.background, area, area)
+            else:
+                surface.fill('black', area)
+            draws = self.draws
+            surface.blits([draws[index][:2] for index in area.collidelistall(draw_rects)], False)
+        surface.set_clip(None)
+
+        if self.output is not None:
+            # The scale is still one full pass, but only the dirty parts are pushed
+            if repaint_all:
+                self.output.present(surface)
+            elif dirty:
+                self.output.present(surface, dirty)
+        elif dirty and surface is pygame.display.get_surface():
+            pygame.display.update(dirty)
+        self.previous = current
+        self.previous_images = [image for image, _, _ in self.draws]
+        if self.output is not None:
+            # Counted on the display, where a larger screen pushes more pixels per logical one
+            self.record_pixels(self.output.pushed_pixels(None if repaint_all else dirty))
+        else:
+            self.record_pixels(sum(rect.width * rect.height for rect in dirty))
@@ -0,0 +1,117 @@
+# Records and replays single games. Run from the project root:
+#   python code/main.py --record game.replay
+#   python code/replay.py game.replay
+import argparse
+import os
+import struct
+import time
+import zlib
+from collections import namedtuple
+
+import pygame
+
+from controls import ScriptedInput, decode_inputs
+from timestep import STEP_MS
+
+# Layout: HEADER, then the zlib-compressed inputs, one byte per simulation step.
+# Seed, world size and the waves are everything else a game needs to play out
+# the same; score and digest describe how it ended, so a replay can check itself.
+# waves is the digest of the wave data file the game was played with.
+MAGIC = b'SSREPLY2'
+HEADER = struct.Struct('<8sIHHHBIIqI')
+
+Replay = namedtuple('Replay', 'seed width height obstacles endless waves steps score digest inputs')
+
+
+def state_digest(game):
+    # Fingerprint of everything a replay has to reproduce
+    aliens = game.aliens
+    player = game.player.sprite.rect
+    digest = zlib.crc32(struct.pack('<qiiiii', game.score, game.lives, aliens.offset_x, aliens.offset_y,
+                                    player.x, player.y))
+    digest = zlib.crc32(aliens.alive.tobytes(), digest)
+    digest = zlib.crc32(aliens.bob.tobytes(), digest)
+    for bunker in game.bunkers:
+        digest = zlib.crc32(bunker.cells, digest)
+    for lasers in (game.player.sprite.lasers, game.alien_lasers):
+        for position in sorted(lasers.positions()):
+            digest = zlib.crc32(struct.pack('<ii', *position), digest)
+    if game.extra:
+        digest = zlib.crc32(struct.pack('<ii', *game.extra.sprite.rect.topleft), digest)
+    return digest
+
+
+def record(game):
+    inputs = bytes(game.recorder.inputs)
+    return Replay(game.seed, game.screen_width, game.screen_height, game.obstacle_amount, game.endless,
+                  game.wave_set.digest, len(inputs), game.score, state_digest(game), inputs)
+
+
+def save_replay(path, replay):
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, *replay[:-1]))
+        f.write(zlib.compress(replay.inputs, 9))
+
+
+def load_replay(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, *fields = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError(f'{path} is not a replay')
+    return Replay(*fields, zlib.decompress(data[HEADER.size:]))
+
+
+def play(replay, renderer=None):
+    # Steps the recorded game as fast as the CPU allows and returns it
+    from main import Game
+    game = Game(replay.width, replay.height, renderer=renderer,
+                input_source=ScriptedInput(decode_inputs(replay.inputs)))
+    game.obstacle_amount = replay.obstacles
+    game.endless = bool(replay.endless)
+    game.reset_game(replay.seed)
+    for _ in range(replay.steps):
+        game.step()
+    if renderer is not None:
+        renderer.begin()
+        game.draw()
+        renderer.present()
+    return game
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Play back a recorded game headless.')
+    parser.add_argument('path')
+    parser.add_argument('--render', action='store_true', help='draw the final state into an off-screen surface')
+    parser.add_argument('--screenshot', help='save the final frame to this image file (implies --render)')
+    args = parser.parse_args()
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.display.init()
+    pygame.font.init()
+
+    replay = load_replay(args.path)
+    renderer = None
+    if args.render or args.screenshot:
+        from render import FullRenderer
+        renderer = FullRenderer(pygame.Surface((replay.width, replay.height)))
+
+    start = time.perf_counter()
+    game = play(replay, renderer)
+    elapsed = time.perf_counter() - start
+
+    played = replay.steps * STEP_MS / 1000
+    digest = state_digest(game)
+    if game.wave_set.digest != replay.waves:
+        print('warning: the wave data has changed since this game was recorded')
+    print(f'seed {replay.seed}  {replay.steps} steps ({played:.1f} s of play) in {elapsed:.3f} s,'
+          f' {played / elapsed if elapsed else float("inf"):.0f}x real time')
+    print(f'score {game.score} (recorded {replay.score})  lives {game.lives}  aliens left {len(game.aliens)}')
+    print('final state matches the recording' if digest == replay.digest and game.score == replay.score
+          else f'final state differs from the recording: digest {digest:08x}, recorded {replay.digest:08x}')
+    if args.screenshot:
+        pygame.image.save(renderer.surface, args.screenshot)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,7 @@
 from setuptools import setup
 
 APP = ['code/main.py']
-DATA_FILES = ['graphics/*', 'audio/*', 'fonts/*']
+DATA_FILES = ['graphics/*', 'audio/*', 'fonts/*', 'data/*']
 OPTIONS = {
     'argv_emulation': True,
     'packages': ['pygame', 'numpy', 'Cython'],
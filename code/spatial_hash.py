@@ -0,0 +1,45 @@
+from collections import defaultdict
+
+
+class SpatialHash:
+    # Uniform grid broadphase: every item is filed under each cell its rect
+    # touches, so a query only looks at items near the queried rect. Items
+    # are filed once and only ever removed, the grid never follows movement.
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self.cells = defaultdict(set)
+        self.item_cells = {}
+
+    def cell_range(self, rect):
+        size = self.cell_size
+        return (rect.left // size, rect.top // size,
+                (rect.right - 1) // size, (rect.bottom - 1) // size)
+
+    def cells_in(self, cell_range):
+        left, top, right, bottom = cell_range
+        return [(x, y) for x in range(left, right + 1) for y in range(top, bottom + 1)]
+
+    def insert(self, item, rect):
+        cell_range = self.cell_range(rect)
+        self.item_cells[item] = cell_range
+        for cell in self.cells_in(cell_range):
+            self.cells[cell].add(item)
+
+    def remove(self, item):
+        cell_range = self.item_cells.pop(item, None)
+        if cell_range is None:
+            return
+        for cell in self.cells_in(cell_range):
+            bucket = self.cells[cell]
+            bucket.discard(item)
+            if not bucket:
+                del self.cells[cell]
+
+    def query(self, rect):
+        found = set()
+        cells = self.cells
+        for cell in self.cells_in(self.cell_range(rect)):
+            bucket = cells.get(cell)
+            if bucket:
+                found |= bucket
+        return found
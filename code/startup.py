@@ -0,0 +1,86 @@
+import threading
+import time
+
+import pygame
+
+
+class StartupTimeline:
+    # Named spans from process start to the first game frame, on whichever
+    # thread they ran. report() is plain text, so on Android it shows up in
+    # logcat along with everything else the game prints.
+    def __init__(self, start=None):
+        self.start = time.perf_counter() if start is None else start
+        self.last = self.start
+        self.spans = []
+
+    def mark(self, name):
+        # A main-thread stage that ran from the previous mark until now
+        now = time.perf_counter()
+        self.spans.append((name, 'main', self.last, now))
+        self.last = now
+
+    def span(self, name, thread, start, end):
+        self.spans.append((name, thread, start, end))
+
+    def report(self):
+        lines = ['startup timeline (ms)', f"{'stage':<24} {'thread':<8} {'start':>8} {'took':>8}"]
+        for name, thread, start, end in sorted(self.spans, key=lambda span: span[2]):
+            lines.append(f'{name:<24} {thread:<8} {(start - self.start) * 1000:>8.1f} {(end - start) * 1000:>8.1f}')
+        lines.append(f"{'total':<24} {'':<8} {'':>8} {(self.last - self.start) * 1000:>8.1f}")
+        return '\n'.join(lines)
+
+
+class AssetLoader:
+    # Runs (name, function) jobs one after another on a background thread.
+    # The main thread polls progress and keeps the window responsive; results
+    # are kept by name and the first error is raised again from result().
+    def __init__(self, jobs, timeline=None):
+        self.jobs = list(jobs)
+        self.timeline = timeline
+        self.results = {}
+        self.completed = 0
+        self.error = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def run(self):
+        for name, job in self.jobs:
+            start = time.perf_counter()
+            try:
+                self.results[name] = job()
+            except Exception as error:
+                self.error = error
+                return
+            finally:
+                if self.timeline is not None:
+                    self.timeline.span(name, 'loader', start, time.perf_counter())
+            self.completed += 1
+
+    @property
+    def progress(self):
+        return self.completed / len(self.jobs) if self.jobs else 1.0
+
+    @property
+    def done(self):
+        return self.error is not None or self.completed == len(self.jobs)
+
+    def result(self, name):
+        if self.error is not None:
+            raise self.error
+        return self.results[name]
+
+
+def draw_loading(surface, progress):
+    # A bare progress bar: nothing here may wait on the assets being loaded
+    surface.fill('black')
+    width, height = surface.get_size()
+    bar = pygame.Rect(0, 0, width // 3, max(4, height // 40))
+    bar.center = (width // 2, height // 2)
+    pygame.draw.rect(surface, 'white', bar, 2)
+    filled = bar.inflate(-6, -6)
+    filled.width = round(filled.width * progress)
+    if filled.width > 0:
+        surface.fill('white', filled)
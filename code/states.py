@@ -0,0 +1,7 @@
+# The game's top-level states. SPACE or a tap moves between them, exactly one
+# transition per press: HOME -> PLAYING, WON -> PLAYING, LOST -> HOME.
+# PLAYING turns into WON or LOST on its own.
+HOME = 'home'
+PLAYING = 'playing'
+WON = 'won'
+LOST = 'lost'
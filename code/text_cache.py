@@ -0,0 +1,30 @@
+class TextCache:
+    # Renders each string once and hands back the same surface until it is
+    # evicted. Reusing the surface also keeps the dirty-rect renderer from
+    # repainting HUD text that did not change.
+    def __init__(self, font, antialias=False, limit=64):
+        self.font = font
+        self.antialias = antialias
+        self.limit = limit
+        self.surfaces = {}
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, text, color='white'):
+        key = (text, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            return surface
+        self.misses += 1
+        # Old scores are never shown again, so the oldest entry goes first
+        if len(self.surfaces) >= self.limit:
+            del self.surfaces[next(iter(self.surfaces))]
+        surface = self.surfaces[key] = self.font.render(text, self.antialias, color)
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
+
+    def __len__(self):
+        return len(self.surfaces)
@@ -0,0 +1,46 @@
+STEP_MS = 1000 / 60
+
+
+class SimulatedClock:
+    # Stands in for pygame.time.get_ticks so cooldowns follow simulation steps
+    def __init__(self, step_ms=STEP_MS):
+        self.step_ms = step_ms
+        self.time = 0.0
+
+    def __call__(self):
+        return int(self.time)
+
+    def advance(self):
+        self.time += self.step_ms
+
+    def reset(self):
+        self.time = 0.0
+
+
+class FixedTimestep:
+    # Turns real frame times into a whole number of fixed simulation steps.
+    # Whatever is left over is kept for the next frame and exposed as alpha,
+    # how far the display is between the last two simulated states.
+    def __init__(self, step_ms=STEP_MS, max_steps=5):
+        self.step_ms = step_ms
+        self.max_steps = max_steps
+        self.accumulator = 0.0
+
+    def advance(self, elapsed_ms):
+        self.accumulator += elapsed_ms
+        steps = int(self.accumulator // self.step_ms)
+        if steps > self.max_steps:
+            # Too far behind (a stall, a slow device): drop the backlog
+            # instead of spending ever longer frames catching up
+            steps = self.max_steps
+            self.accumulator = 0.0
+        else:
+            self.accumulator -= steps * self.step_ms
+        return steps
+
+    @property
+    def alpha(self):
+        return self.accumulator / self.step_ms
+
+    def reset(self):
+        self.accumulator = 0.0
@@ -0,0 +1,81 @@
+import json
+import math
+import zlib
+from collections import namedtuple
+
+WAVES_PATH = './data/waves.json'
+
+# One formation. layout is a tuple of strings, one per row, where each
+# character is an alien type symbol and '.' or ' ' leaves the slot empty.
+# speed is pixels per step, fire_interval milliseconds between alien shots.
+Wave = namedtuple('Wave', 'layout speed fire_interval laser_speed drop x_distance y_distance x_offset y_offset')
+WAVE_DEFAULTS = {'speed': 1, 'fire_interval': 700, 'laser_speed': 6, 'drop': 2,
+                 'x_distance': 60, 'y_distance': 48, 'x_offset': 70, 'y_offset': 100}
+
+AlienType = namedtuple('AlienType', 'image value')
+
+# The original formation: yellow on top, two green rows, red below
+GRID_ROWS = 'yggr'
+
+
+def sprite_scale(wave):
+    # Waves packed tighter than the original spacing shrink their sprites to match
+    return min(1, wave.x_distance / WAVE_DEFAULTS['x_distance'], wave.y_distance / WAVE_DEFAULTS['y_distance'])
+
+
+def grid_layout(rows, cols):
+    return tuple(GRID_ROWS[min(row, 3)] * cols for row in range(rows))
+
+
+def grid_wave(rows, cols, **settings):
+    return Wave(layout=grid_layout(rows, cols), **{**WAVE_DEFAULTS, **settings})
+
+
+class WaveSet:
+    # The alien types and waves from a data file, plus the endless mode that
+    # keeps generating bigger, faster waves once the listed ones are cleared
+    def __init__(self, data):
+        self.aliens = {symbol: AlienType(**alien) for symbol, alien in data['aliens'].items()}
+        self.waves = [self.parse(wave) for wave in data['waves']]
+        self.endless_settings = data.get('endless', {})
+        # Replays check this to make sure they run against the same waves
+        self.digest = zlib.crc32(json.dumps(data, sort_keys=True).encode())
+
+    @staticmethod
+    def parse(wave):
+        wave = {**WAVE_DEFAULTS, **wave}
+        wave['layout'] = tuple(wave['layout'])
+        return Wave(**wave)
+
+    @classmethod
+    def load(cls, path=WAVES_PATH):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def wave(self, index, endless=False):
+        if index < len(self.waves):
+            return self.waves[index]
+        if endless:
+            return self.endless_wave(index - len(self.waves))
+        return None
+
+    def endless_wave(self, number, screen_width=1280, bottom=440):
+        # Each wave has `growth` times the aliens of the one before, up to
+        # max_aliens, squeezed into the same area above the bunkers
+        settings = {'rows': 8, 'cols': 14, 'growth': 1.5, 'max_aliens': 4000, 'speed': 2, 'max_speed': 4,
+                    'fire_interval': 500, 'min_fire_interval': 100, **self.endless_settings}
+        base_rows, base_cols = settings['rows'], settings['cols']
+        count = min(base_rows * base_cols * settings['growth'] ** number, settings['max_aliens'])
+        scale = math.sqrt(count / (base_rows * base_cols))
+        rows = max(1, round(base_rows * scale))
+        cols = max(1, min(round(base_cols * scale), int(settings['max_aliens']) // rows))
+
+        x_offset, y_offset = WAVE_DEFAULTS['x_offset'], WAVE_DEFAULTS['y_offset']
+        x_distance = min(WAVE_DEFAULTS['x_distance'], (screen_width - 2 * x_offset) // cols)
+        y_distance = min(WAVE_DEFAULTS['y_distance'], (bottom - y_offset) // rows)
+        return Wave(layout=grid_layout(rows, cols),
+                    speed=min(settings['max_speed'], settings['speed'] + number // 3),
+                    fire_interval=max(settings['min_fire_interval'], int(settings['fire_interval'] * 0.85 ** number)),
+                    laser_speed=WAVE_DEFAULTS['laser_speed'], drop=WAVE_DEFAULTS['drop'],
+                    x_distance=max(1, x_distance), y_distance=max(1, y_distance),
+                    x_offset=x_offset, y_offset=y_offset)